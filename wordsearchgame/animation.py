@@ -0,0 +1,48 @@
+import pygame
+
+
+class Tween:
+    # Calls on_update(progress) with progress going from 0 to 1 over duration ms,
+    # starting delay ms after it is added to a Timeline, then calls on_finish()
+    def __init__(self, duration, on_update=None, on_finish=None, delay=0):
+        self.duration = duration
+        self.on_update = on_update
+        self.on_finish = on_finish
+        self.delay = delay
+        self.start = None
+
+
+class Timeline:
+    # Advances every running tween from the main loop's frame clock, so blinks,
+    # highlights and end screens never stop the loop from reading input
+    def __init__(self, now=pygame.time.get_ticks):
+        self.now = now
+        self.tweens = []
+
+    def add(self, tween):
+        tween.start = self.now() + tween.delay
+        self.tweens.append(tween)
+        return tween
+
+    def after(self, delay, callback):
+        return self.add(Tween(0, on_finish=callback, delay=delay))
+
+    def cancel(self, tween):
+        if tween in self.tweens:
+            self.tweens.remove(tween)
+
+    def busy(self):
+        return bool(self.tweens)
+
+    def update(self):
+        now = self.now()
+        for tween in list(self.tweens):
+            if now < tween.start:
+                continue
+            progress = min(1.0, (now - tween.start) / tween.duration) if tween.duration else 1.0
+            if tween.on_update:
+                tween.on_update(progress)
+            if progress >= 1.0:
+                self.tweens.remove(tween)
+                if tween.on_finish:
+                    tween.on_finish()
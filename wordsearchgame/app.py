@@ -92,6 +92,7 @@ if __name__ == '__main__':
 import string
 import pygame
 import sys
+from collections import deque
 from flask import Flask, render_template
 
 # Initialize the Flask application
@@ -152,56 +153,213 @@ def run_word_search_game():
 if __name__ == '__main__':
     app.run(debug=True)'''
 # Import the required libraries
+import os
 import random
-import string
-import pygame
-import sys
-from flask import Flask, render_template
-from finalchange_adsa import main
+import threading
+from collections import deque
+from flask import Flask, Response, render_template, jsonify, request
+from game_session import GameSession
+from puzzle import WORD_LISTS as BUILT_IN_WORD_LISTS
+from dictionary_file import DICTIONARY_PATH, open_dictionary
+from difficulty import DIFFICULTIES
+from puzzle_cache import PuzzleCache
+from puzzle_pool import PuzzlePool
+from session_store import InMemoryBackend, RedisBackend, SessionStore
+from shapes import make_mask
+from solver_metrics import METRICS
 
 
 
 # Initialize the Flask application
 app = Flask(__name__)
 
-# Define colors
-BLACK = (0, 0, 0)
-WHITE = (200, 200, 200)
-RED = (255, 0, 0)
-GREEN = (0, 255, 0)
-
 # Define the TrieNode and Trie classes
 # Define the WordSearchGraph and WordSearchCSP classes
 
-# Define the main function to run the game
-def pygame_page():
-    # Initialize Pygame
-    pygame.init()
-
-    # Set up the screen dimensions
-    screen_width = 800
-    screen_height = 800
-    SCREEN = pygame.display.set_mode((screen_width, screen_height))
-    pygame.display.set_caption("Word Search Game")
+# Themed word lists from the prebuilt dictionary (see build_dictionary.py), mapped
+# once: themes are decoded when a game picks one, and every session finds its
+# words with the mapped trie. Without a dictionary the built-in lists are used.
+DICTIONARY = open_dictionary() if os.path.exists(DICTIONARY_PATH) else None
+WORD_LISTS = DICTIONARY.word_lists if DICTIONARY else BUILT_IN_WORD_LISTS
+
+# Boards are generated ahead of time for every word list at these sizes
+GRID_SIZES = [14]
+PUZZLE_POOL = None
+PUZZLE_POOL_LOCK = threading.Lock()
+
+# Seeded solvers raced for a board when the pool has none ready
+PORTFOLIO_SOLVERS = 4
+
+# Seeded boards (daily puzzles, bug reports) are generated once and then shared;
+# set PUZZLE_CACHE_DIR to keep them on disk across restarts
+PUZZLE_CACHE = PuzzleCache(directory=os.environ.get('PUZZLE_CACHE_DIR'))
+
+# Running games by id. The server never opens a pygame window: clients fetch the
+# grid as JSON and post their selections back. Games are kept as compact records
+# in this process, or in Redis when SESSION_STORE_URL is a redis:// URL.
+def make_session_store(url=os.environ.get('SESSION_STORE_URL')):
+    backend = RedisBackend.from_url(url) if url else InMemoryBackend()
+    return SessionStore(backend, trie=DICTIONARY.trie if DICTIONARY else None)
+
+
+SESSIONS = make_session_store()
+
+# Most recent word-found events posted by the pygame clients
+WORD_FOUND_EVENTS = deque(maxlen=1000)
+
+
+def get_puzzle_pool():
+    # Built by the first request that needs it; the lock keeps two first requests
+    # on different threads from each starting a pool of processes
+    global PUZZLE_POOL
+    if PUZZLE_POOL is None:
+        with PUZZLE_POOL_LOCK:
+            if PUZZLE_POOL is None:
+                pool = PuzzlePool(portfolio=PORTFOLIO_SOLVERS)
+                pool.warm(WORD_LISTS, GRID_SIZES)
+                PUZZLE_POOL = pool
+    return PUZZLE_POOL
+
+
+def get_game(game_id):
+    game = SESSIONS.load(game_id)
+    if game is None:
+        return None, (jsonify({'status': 'error', 'message': 'Game not found!'}), 404)
+    return game, None
+
+
+def new_game(data):
+    # Starts a game from a request body and returns (game, None), or
+    # (None, (message, status)). {"seed": int, "theme": int} replays a seeded
+    # board, e.g. the daily puzzle; otherwise a ready board comes from the pool
+    # instead of being generated in the request. {"difficulty": "easy" |
+    # "medium" | "hard"} asks for a board built to that target, and {"shape":
+    # "heart"} (see shapes.make_mask) for a shaped board. Shared with async_app.
+    if not isinstance(data, dict):
+        return None, ("the request body must be a JSON object", 400)
+    difficulty = data.get('difficulty')
+    if difficulty is not None and (not isinstance(difficulty, str) or difficulty not in DIFFICULTIES):
+        return None, (f"unknown difficulty {difficulty!r}; use {', '.join(DIFFICULTIES)}", 400)
+    shape = data.get('shape')
+    if shape is not None:
+        try:
+            make_mask(shape, GRID_SIZES[0])
+        except (TypeError, ValueError) as e:
+            return None, (str(e), 400)
+    if data.get('seed') is not None:
+        try:
+            seed = int(data['seed'])
+            theme = int(data.get('theme', seed % len(WORD_LISTS)))
+        except (TypeError, ValueError) as e:
+            return None, (str(e), 400)
+        if not 0 <= theme < len(WORD_LISTS):
+            return None, (f"theme must be from 0 to {len(WORD_LISTS) - 1}", 400)
+        word_list = WORD_LISTS[theme]
+        puzzle = PUZZLE_CACHE.get(word_list, GRID_SIZES[0], seed, difficulty, shape)
+        if puzzle is None:
+            return None, (f"seed {seed} does not give a board", 422)
+    else:
+        puzzle = get_puzzle_pool().get(random.choice(WORD_LISTS), random.choice(GRID_SIZES), difficulty, shape)
+        if puzzle is None:
+            return None, (f"the words do not fit a {shape or 'square'} board at this size", 422)
+    game = GameSession(puzzle, trie=SESSIONS.trie(puzzle['words']))
+    SESSIONS.save(game)
+    return game, None
+
+
+def play_selection(game_id, data):
+    # Applies a {"start": [row, col], "end": [row, col]} selection to the game and
+    # saves it in one update, so selections racing on other threads or nodes
+    # can't undo each other. Returns (game, result), or (None, None) if there is
+    # no such game; raises KeyError, TypeError or ValueError for a malformed one.
+    if not isinstance(data, dict):
+        raise TypeError("the request body must be a JSON object")
+    start_pos = tuple(int(value) for value in data['start'])
+    end_pos = tuple(int(value) for value in data['end'])
+    return SESSIONS.update(game_id, lambda game: game.select(start_pos, end_pos))
+
+
+def word_found_events(data):
+    # The events of a /word_found body, or None if it is not one. Clients post
+    # batches as {"events": [{"word", "definition", "time"}, ...]}; a single
+    # {"word", "definition"} object is accepted too. Shared with async_app.
+    if not isinstance(data, dict):
+        return None
+    events = data.get('events', [data] if 'word' in data else [])
+    if not isinstance(events, list) or not all(isinstance(event, dict) for event in events):
+        return None
+    return events
 
-    # Run your main game loop here
-    # You can copy and paste your main() function here
-    
-    # Quit Pygame
-    pygame.quit()
 
-# Define the Flask route for the Pygame page
+# Define the Flask route for the start page
 @app.route('/')
 def home():
     return render_template('start_page.html')
 
 @app.route('/start_game', methods=['POST'])
+@app.route('/games', methods=['POST'])
 def start_game():
-    # Run the Pygame Word Search game function
-    pygame_page()
-    
-    # Return a placeholder message (this will not be visible to the user)
-    return main()
+    game, error = new_game(request.get_json(silent=True) or {})
+    if error:
+        message, status = error
+        return jsonify({'status': 'error', 'message': message}), status
+    return jsonify(game.state()), 201
+
+@app.route('/games/<game_id>')
+def game_state(game_id):
+    game, error = get_game(game_id)
+    if error:
+        return error
+    return jsonify(game.state())
+
+@app.route('/games/<game_id>/select', methods=['POST'])
+def select(game_id):
+    # Body: {"start": [row, col], "end": [row, col]}
+    try:
+        game, result = play_selection(game_id, request.get_json(silent=True) or {})
+    except (KeyError, TypeError, ValueError) as e:
+        return jsonify({'status': 'error', 'message': str(e)}), 400
+    if game is None:
+        return jsonify({'status': 'error', 'message': 'Game not found!'}), 404
+    return jsonify(result)
+
+@app.route('/games/<game_id>/hint')
+def hint(game_id):
+    game, error = get_game(game_id)
+    if error:
+        return error
+    return jsonify({'hint': game.hint()})
+
+@app.route('/word_found', methods=['POST'])
+def word_found():
+    events = word_found_events(request.get_json(silent=True) or {})
+    if events is None:
+        return jsonify({'status': 'error', 'message': 'expected {"events": [{"word", "definition"}, ...]}'}), 400
+    WORD_FOUND_EVENTS.extend(events)
+    return jsonify({'status': 'success', 'received': len(events)})
+
+@app.route('/pool_stats')
+def pool_stats():
+    return jsonify(get_puzzle_pool().stats())
+
+@app.route('/session_stats')
+def session_stats():
+    return jsonify(SESSIONS.stats())
+
+@app.route('/cache_stats')
+def cache_stats():
+    return jsonify(PUZZLE_CACHE.stats())
+
+@app.route('/metrics')
+def metrics():
+    # Solver histograms for every board generated by this process, in the
+    # Prometheus text format
+    return Response(METRICS.prometheus(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/solver_stats')
+def solver_stats():
+    # The same totals as JSON, with the slowest solves and their slowest words
+    return jsonify(METRICS.as_dict())
 
 if __name__ == '__main__':
     app.run(debug=True)
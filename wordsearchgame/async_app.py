@@ -0,0 +1,226 @@
+# Async (ASGI) mode of app.py: the same routes on Quart, plus a WebSocket per game
+# that pushes the countdown, selection results and game over, so clients stop
+# polling for the timer. Countdowns for every game run off one TimerWheel on the
+# event loop rather than a thread or a timer per game. The session store may be
+# Redis, so every load and save runs in a worker thread via asyncio.to_thread.
+# Run it with an ASGI server, e.g. `hypercorn async_app:app`; quart is only
+# needed for this mode (see the README).
+import asyncio
+import json
+import time
+
+from quart import Quart, Response, jsonify, render_template, request, websocket
+
+from app import (PUZZLE_CACHE, SESSIONS, WORD_FOUND_EVENTS, get_puzzle_pool, new_game,
+                 play_selection, word_found_events)
+from solver_metrics import METRICS
+from timer_wheel import TimerWheel
+
+app = Quart(__name__)
+
+WHEEL = TimerWheel()
+
+# Games with at least one open WebSocket, by id
+CHANNELS = {}
+
+
+class GameChannel:
+    # The WebSocket connections watching one game. Each connection has a queue
+    # that its own task drains to the socket, so publishing from a wheel callback
+    # or a route never waits on a slow client.
+    def __init__(self, game_id, deadline):
+        self.game_id = game_id
+        self.deadline = deadline
+        self.queues = set()
+        self.over = False
+        self._expiring = None
+
+    def publish(self, message):
+        for queue in self.queues:
+            queue.put_nowait(message)
+
+    def tick(self):
+        # Fired by the wheel each time the countdown changes
+        if self.over:
+            return
+        if not self.queues:
+            CHANNELS.pop(self.game_id, None)
+            return
+        now = time.time()
+        time_left = max(0, self.deadline - int(now))
+        if time_left == 0:
+            self._expiring = asyncio.get_running_loop().create_task(self.expire())
+            return
+        self.publish({'type': 'tick', 'time_left': time_left})
+        WHEEL.schedule(int(now) + 1, self.tick)
+
+    async def expire(self):
+        self.finish(await asyncio.to_thread(SESSIONS.load, self.game_id))
+
+    def finish(self, game):
+        self.over = True
+        CHANNELS.pop(self.game_id, None)
+        message = {'type': 'game_over', 'score': 0, 'found_words': []}
+        if game is not None:
+            message.update(score=game.score, found_words=sorted(game.found_words))
+        self.publish(message)
+
+
+def get_channel(game):
+    channel = CHANNELS.get(game.game_id)
+    if channel is None:
+        channel = CHANNELS[game.game_id] = GameChannel(game.game_id, game.deadline)
+        WHEEL.schedule(int(time.time()) + 1, channel.tick)
+    return channel
+
+
+def publish_selection(game, result):
+    channel = CHANNELS.get(game.game_id)
+    if channel is None:
+        return
+    channel.publish(dict(result, type='selection'))
+    if result['game_over'] and not channel.over:
+        channel.finish(game)
+
+
+def error_response(message, status):
+    return jsonify({'status': 'error', 'message': message}), status
+
+
+@app.before_serving
+async def start_wheel():
+    app.wheel_task = asyncio.get_running_loop().create_task(WHEEL.run())
+
+
+@app.after_serving
+async def stop_wheel():
+    app.wheel_task.cancel()
+
+
+@app.route('/')
+async def home():
+    return await render_template('start_page.html')
+
+@app.route('/start_game', methods=['POST'])
+@app.route('/games', methods=['POST'])
+async def start_game():
+    # A seeded board may have to be generated, so keep it off the event loop
+    data = await request.get_json(silent=True) or {}
+    game, error = await asyncio.to_thread(new_game, data)
+    if error:
+        return error_response(*error)
+    return jsonify(game.state()), 201
+
+@app.route('/games/<game_id>')
+async def game_state(game_id):
+    game = await asyncio.to_thread(SESSIONS.load, game_id)
+    if game is None:
+        return error_response('Game not found!', 404)
+    return jsonify(game.state())
+
+@app.route('/games/<game_id>/select', methods=['POST'])
+async def select(game_id):
+    # Body: {"start": [row, col], "end": [row, col]}; the result is also pushed to
+    # the game's WebSocket
+    data = await request.get_json(silent=True) or {}
+    try:
+        game, result = await asyncio.to_thread(play_selection, game_id, data)
+    except (KeyError, TypeError, ValueError) as e:
+        return error_response(str(e), 400)
+    if game is None:
+        return error_response('Game not found!', 404)
+    publish_selection(game, result)
+    return jsonify(result)
+
+@app.route('/games/<game_id>/hint')
+async def hint(game_id):
+    game = await asyncio.to_thread(SESSIONS.load, game_id)
+    if game is None:
+        return error_response('Game not found!', 404)
+    return jsonify({'hint': game.hint()})
+
+@app.websocket('/games/<game_id>/ws')
+async def game_socket(game_id):
+    # Server -> client: {"type": "state", ...game state} once, then "tick"
+    # ({"time_left"}), "selection" (the select() result) and "game_over"
+    # ({"score", "found_words"}). Client -> server: {"start", "end"} selections.
+    # The server closes the socket once it has sent game_over.
+    game = await asyncio.to_thread(SESSIONS.load, game_id)
+    if game is None:
+        await websocket.close(1008)
+        return
+    await websocket.send(json.dumps(dict(game.state(), type='state')))
+    if game.is_over():
+        await websocket.send(json.dumps({'type': 'game_over', 'score': game.score,
+                                         'found_words': sorted(game.found_words)}))
+        await websocket.close(1000)
+        return
+    channel = get_channel(game)
+    queue = asyncio.Queue()
+    channel.queues.add(queue)
+
+    async def send_messages():
+        # Returns after sending game_over
+        while True:
+            message = await queue.get()
+            await websocket.send(json.dumps(message))
+            if message['type'] == 'game_over':
+                return
+
+    async def receive_selections():
+        # Returns if the game is gone
+        while True:
+            message = await websocket.receive()
+            try:
+                game, result = await asyncio.to_thread(play_selection, game_id, json.loads(message))
+            except (KeyError, TypeError, ValueError) as e:
+                queue.put_nowait({'type': 'error', 'message': str(e)})
+                continue
+            if game is None:
+                return
+            publish_selection(game, result)
+
+    sender = asyncio.create_task(send_messages())
+    receiver = asyncio.create_task(receive_selections())
+    try:
+        done, _ = await asyncio.wait((sender, receiver), return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        sender.cancel()
+        receiver.cancel()
+        channel.queues.discard(queue)
+    for task in done:
+        task.result()
+    await websocket.close(1000)
+
+@app.route('/word_found', methods=['POST'])
+async def word_found():
+    events = word_found_events(await request.get_json(silent=True) or {})
+    if events is None:
+        return error_response('expected {"events": [{"word", "definition"}, ...]}', 400)
+    WORD_FOUND_EVENTS.extend(events)
+    return jsonify({'status': 'success', 'received': len(events)})
+
+@app.route('/pool_stats')
+async def pool_stats():
+    return jsonify(get_puzzle_pool().stats())
+
+@app.route('/session_stats')
+async def session_stats():
+    stats = await asyncio.to_thread(SESSIONS.stats)
+    stats.update(channels=len(CHANNELS), timers=WHEEL.pending)
+    return jsonify(stats)
+
+@app.route('/cache_stats')
+async def cache_stats():
+    return jsonify(PUZZLE_CACHE.stats())
+
+@app.route('/metrics')
+async def metrics():
+    return Response(METRICS.prometheus(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/solver_stats')
+async def solver_stats():
+    return jsonify(METRICS.as_dict())
+
+if __name__ == '__main__':
+    app.run()
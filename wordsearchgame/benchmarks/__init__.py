@@ -0,0 +1,4 @@
+# Benchmarks for the hot paths: board generation, trie build and lookup,
+# selection resolution and frame rendering. Run them all from the wordsearchgame
+# directory with `python -m benchmarks` (see __main__.py), or one module on its
+# own, e.g. `python -m benchmarks.bench_placement`.
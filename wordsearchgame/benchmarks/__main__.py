@@ -0,0 +1,89 @@
+import argparse
+import importlib
+import json
+import platform
+import sys
+import time
+
+SUITES = ['generation', 'trie', 'selection', 'render']
+
+
+def flatten(metrics, prefix=''):
+    flat = {}
+    for key, value in metrics.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{prefix}{key}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[prefix + key] = value
+    return flat
+
+
+def compare(results, baseline, threshold):
+    # Metrics that got worse than the baseline by more than threshold (a fraction):
+    # times (*_ms, seconds) going up, rates (*_per_second) going down
+    regressions = []
+    for name, metrics in results.items():
+        old_metrics = flatten(baseline.get(name, {}))
+        for key, new in flatten(metrics).items():
+            old = old_metrics.get(key)
+            if not old:
+                continue
+            if key.endswith('_ms') or (key.endswith('seconds') and not key.endswith('per_second')):
+                change = new / old - 1
+            elif key.endswith('per_second') or key.endswith('success_rate'):
+                change = old / new - 1 if new else float('inf')
+            else:
+                continue
+            if change > threshold:
+                regressions.append((name, key, old, new, change))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks',
+                                     description="Benchmark generation, tries, selection and rendering")
+    parser.add_argument("suites", nargs="*", help=f"any of {', '.join(SUITES)} (default: all)")
+    parser.add_argument("--quick", action="store_true", help="fewer sizes and runs, for a smoke test")
+    parser.add_argument("-o", "--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="JSON file from an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=0.25,
+                        help="fractional slowdown that counts as a regression (default 0.25)")
+    args = parser.parse_args(argv)
+    unknown = set(args.suites) - set(SUITES)
+    if unknown:
+        parser.error(f"unknown suite {', '.join(sorted(unknown))}; choose from {', '.join(SUITES)}")
+
+    results = {}
+    for suite in args.suites or SUITES:
+        module = importlib.import_module(f"benchmarks.bench_{suite}")
+        start = time.perf_counter()
+        suite_results = module.run(quick=args.quick)
+        results.update(suite_results)
+        print(f"{suite}: {len(suite_results)} benchmarks in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+        for name, metrics in suite_results.items():
+            shown = {key: round(value, 3) for key, value in flatten(metrics).items()
+                     if key in ('median_ms', 'p99_ms', 'success_rate', 'seconds') or key.endswith('per_second')}
+            print(f"  {name:<34} {shown or metrics}", file=sys.stderr)
+
+    report = {
+        'meta': {'python': platform.python_version(), 'platform': platform.platform(),
+                 'time': time.strftime('%Y-%m-%dT%H:%M:%S'), 'quick': args.quick},
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)['results']
+        regressions = compare(results, baseline, args.threshold)
+        for name, key, old, new, change in regressions:
+            print(f"REGRESSION {name} {key}: {old:.3f} -> {new:.3f} ({change:+.0%})", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions over {args.threshold:.0%} against {args.baseline}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
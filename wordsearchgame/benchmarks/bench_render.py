@@ -0,0 +1,55 @@
+import os
+import time
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import pygame
+
+import finalchange_adsa
+from benchmarks.timing import summarize
+from board_renderer import BoardRenderer
+from puzzle import WORD_LISTS, generate_puzzle
+
+FRAMES = 200
+
+
+def run(quick=False):
+    # Headless frame times of the pygame game: a full draw_grid() repaint, and a
+    # BoardRenderer frame after one drag step invalidated a handful of cells
+    frames = FRAMES // 4 if quick else FRAMES
+    pygame.init()
+    screen = finalchange_adsa.SCREEN = pygame.display.set_mode((1200, 500))
+    results = {}
+    for size in (14, 30):
+        puzzle = generate_puzzle(WORD_LISTS[0], size, seed=size)
+        grid = [list(row) for row in puzzle['grid']]
+        selected = set()
+        found = set()
+
+        timings = []
+        for frame in range(frames):
+            start = time.perf_counter()
+            screen.fill(finalchange_adsa.LIGHT_GRAY)
+            finalchange_adsa.draw_grid(grid, selected, found, frame, 130)
+            pygame.display.flip()
+            timings.append(time.perf_counter() - start)
+        results[f"render/full/{size}x{size}"] = summarize(timings)
+
+        renderer = BoardRenderer(screen, size, size, 400 // size,
+                                 lambda i, j, rect: finalchange_adsa.draw_cell(grid, i, j, rect, selected, found),
+                                 finalchange_adsa.LIGHT_GRAY)
+        renderer.draw_cells()
+        renderer.present()
+        timings = []
+        for frame in range(frames):
+            cells = {(frame % size, col) for col in range(5)}
+            start = time.perf_counter()
+            renderer.invalidate(selected ^ cells)
+            selected = cells
+            renderer.draw_cells()
+            renderer.region('score', frame, lambda: finalchange_adsa.display_score(frame))
+            renderer.present()
+            timings.append(time.perf_counter() - start)
+        results[f"render/dirty/{size}x{size}"] = summarize(timings)
+    pygame.quit()
+    return results
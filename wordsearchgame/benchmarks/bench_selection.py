@@ -0,0 +1,55 @@
+import random
+import string
+
+from benchmarks.timing import throughput
+from puzzle import LineIndex, find_selected_word, get_cells_between
+
+SIZES = [14, 60]
+DRAG_EVENTS = 50000
+
+
+def drag_events(size, rng, count):
+    # (start, end) pairs as a drag produces them: ends along one of the eight
+    # directions from a fixed start, plus the occasional off-line end
+    events = []
+    steps = [(0, 1), (1, 0), (1, 1), (1, -1), (0, -1), (-1, 0), (-1, -1), (-1, 1)]
+    while len(events) < count:
+        start = (rng.randrange(size), rng.randrange(size))
+        step = rng.choice(steps)
+        for length in range(size):
+            end = (start[0] + step[0] * length, start[1] + step[1] * length)
+            if not (0 <= end[0] < size and 0 <= end[1] < size):
+                break
+            events.append((start, end))
+            if rng.random() < 0.2:
+                events.append((start, (rng.randrange(size), rng.randrange(size))))
+    return events[:count]
+
+
+def run(quick=False):
+    # Drag events per second resolved to (word, cells): the string/set rebuilding
+    # functions against a warm LineIndex
+    rng = random.Random(0)
+    count = DRAG_EVENTS // 10 if quick else DRAG_EVENTS
+    results = {}
+    for size in SIZES:
+        grid = [[rng.choice(string.ascii_uppercase) for _ in range(size)] for _ in range(size)]
+        events = drag_events(size, rng, count)
+        lines = LineIndex(grid)
+
+        def rebuild(event):
+            get_cells_between(*event)
+            find_selected_word(grid, *event)
+
+        def indexed(event):
+            lines.cells(*event)
+            lines.word(*event)
+
+        indexed_rate = throughput(indexed, events)
+        results[f"selection/{size}x{size}"] = {
+            'events': len(events),
+            'rebuild_events_per_second': throughput(rebuild, events),
+            'line_index_events_per_second': indexed_rate,
+            'line_index_us_per_event': 1e6 / indexed_rate,
+        }
+    return results
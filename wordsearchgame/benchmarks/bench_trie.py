@@ -0,0 +1,63 @@
+import os
+import random
+import string
+import tempfile
+import time
+
+from benchmarks.timing import throughput
+from compact_trie import CompactTrie
+from dictionary_file import open_dictionary, write_dictionary
+from puzzle import Trie
+
+DICTIONARY_SIZE = 200000
+QUICK_DICTIONARY_SIZE = 20000
+
+
+def make_words(count, rng):
+    words = set()
+    while len(words) < count:
+        words.add(''.join(rng.choice(string.ascii_uppercase) for _ in range(rng.randint(3, 12))))
+    return sorted(words)
+
+
+def build_trie(words):
+    trie = Trie()
+    for word in words:
+        trie.insert(word, word.lower())
+    return trie
+
+
+def build_compact_trie(words):
+    trie = CompactTrie((word, word.lower()) for word in words)
+    trie.search('')  # packs the arrays
+    return trie
+
+
+def run(quick=False):
+    # Build time and search throughput (hits and misses) at dictionary scale for
+    # the dict-of-nodes Trie, CompactTrie, and a CompactTrie mapped from a
+    # dictionary file, whose "build" is opening the file
+    rng = random.Random(0)
+    words = make_words(QUICK_DICTIONARY_SIZE if quick else DICTIONARY_SIZE, rng)
+    hits = rng.sample(words, min(len(words), 50000))
+    misses = [word + 'Q' for word in hits]
+    results = {}
+    tries = {}
+    for name, build in (('trie', build_trie), ('compact_trie', build_compact_trie)):
+        start = time.perf_counter()
+        tries[name] = build(words)
+        results[f"{name}/build"] = {'words': len(words), 'seconds': time.perf_counter() - start}
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'words.dict')
+        write_dictionary(path, [[(word, word.lower()) for word in words]])
+        start = time.perf_counter()
+        dictionary = open_dictionary(path)
+        results['mapped_trie/build'] = {'words': len(words), 'seconds': time.perf_counter() - start}
+        tries['mapped_trie'] = dictionary.trie
+        for name, trie in tries.items():
+            results[f"{name}/search"] = {'hits_per_second': throughput(trie.search, hits),
+                                         'misses_per_second': throughput(trie.search, misses)}
+        tries.clear()
+        dictionary.close()
+    return results
@@ -0,0 +1,49 @@
+import statistics
+import time
+
+
+def percentile(sorted_values, fraction):
+    # Nearest-rank percentile of an already sorted list
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(seconds):
+    # Distribution of a list of timings, in milliseconds
+    values = sorted(value * 1000 for value in seconds)
+    if not values:
+        return {'runs': 0}
+    return {
+        'runs': len(values),
+        'min_ms': values[0],
+        'median_ms': statistics.median(values),
+        'mean_ms': statistics.fmean(values),
+        'p90_ms': percentile(values, 0.90),
+        'p99_ms': percentile(values, 0.99),
+        'max_ms': values[-1],
+    }
+
+
+def time_calls(fn, args_list):
+    # Wall time of fn(*args) for each args in args_list, and the results
+    timings = []
+    results = []
+    for args in args_list:
+        start = time.perf_counter()
+        results.append(fn(*args))
+        timings.append(time.perf_counter() - start)
+    return timings, results
+
+
+def throughput(fn, items, repeat=3):
+    # Best-of-repeat calls per second of fn(item) over items
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for item in items:
+            fn(item)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return len(items) / best if best else float('inf')
@@ -0,0 +1,75 @@
+import pygame
+
+from render_cache import cell_rects
+
+FRAME_RATE = 60
+
+
+class BoardRenderer:
+    # Retained-mode drawing for the game screens. Cells are redrawn only after
+    # invalidate(), and named regions (score, timer, clue list) only when the key
+    # passed to region() changes. Everything redrawn in a frame is collected and
+    # handed to pygame.display.update() in present(), so an idle board costs a
+    # few event polls per frame instead of a full repaint. For a shaped board,
+    # active(row, col) says which cells are on it; the rest are never drawn.
+    def __init__(self, surface, rows, cols, block_size, draw_cell, background, active=None):
+        self.surface = surface
+        self.rects = cell_rects(rows, cols, block_size)
+        self.draw_cell = draw_cell  # draw_cell(row, col, rect) paints one cell
+        self.active = active or (lambda row, col: True)
+        self.background = background
+        self.dirty = []
+        self._invalid = set()
+        self._regions = {}
+        self._full = True
+        self._full_frame = False
+
+    def invalidate(self, cells=None):
+        # cells is an iterable of (row, col); None repaints the whole screen
+        if cells is None:
+            self._full = True
+        else:
+            self._invalid.update(cells)
+
+    def draw_cells(self):
+        if self._full:
+            self.surface.fill(self.background)
+            for i, row in enumerate(self.rects):
+                for j, rect in enumerate(row):
+                    if self.active(i, j):
+                        self.draw_cell(i, j, rect)
+            self._regions.clear()
+            self._invalid.clear()
+            self._full = False
+            self._full_frame = True
+            return
+        rows = len(self.rects)
+        cols = len(self.rects[0])
+        for i, j in self._invalid:
+            if not (0 <= i < rows and 0 <= j < cols) or not self.active(i, j):
+                continue
+            rect = self.rects[i][j]
+            self.surface.fill(self.background, rect)
+            self.draw_cell(i, j, rect)
+            self.dirty.append(rect)
+        self._invalid.clear()
+
+    def region(self, name, key, draw):
+        # draw() paints the region and returns the Rect it covered
+        previous = self._regions.get(name)
+        if previous is not None:
+            if previous[0] == key:
+                return
+            self.surface.fill(self.background, previous[1])
+            self.dirty.append(previous[1])
+        rect = draw()
+        self._regions[name] = (key, rect)
+        self.dirty.append(rect)
+
+    def present(self):
+        if self._full_frame:
+            pygame.display.flip()
+        elif self.dirty:
+            pygame.display.update(self.dirty)
+        self.dirty = []
+        self._full_frame = False
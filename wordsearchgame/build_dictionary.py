@@ -0,0 +1,31 @@
+import argparse
+import time
+
+from dictionary_file import DICTIONARY_PATH, write_dictionary
+from puzzle import WORD_LISTS
+from word_import import ImportReport, read_word_list
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile word lists into a memory-mapped dictionary file")
+    parser.add_argument("word_lists", nargs="*",
+                        help="CSV, TSV or JSONL word/definition files, one theme each (default: puzzle.WORD_LISTS)")
+    parser.add_argument("--max-length", type=int, default=None, help="drop words longer than this")
+    parser.add_argument("-o", "--output", default=DICTIONARY_PATH)
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    word_lists = []
+    for path in args.word_lists:
+        report = ImportReport()
+        word_lists.append(read_word_list(path, args.max_length, report))
+        print(f"{path}: {report}")
+    word_lists = word_lists or WORD_LISTS
+    write_dictionary(args.output, word_lists)
+    words = sum(len(word_list) for word_list in word_lists)
+    print(f"Wrote {len(word_lists)} themes, {words} words to {args.output} "
+          f"in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+import argparse
+import csv
+import json
+import os
+import random
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from difficulty import DIFFICULTIES
+from puzzle import generate_puzzle, pack_puzzle
+from shapes import make_mask
+from word_import import FORMATS, ImportReport, read_word_list
+
+CSV_FIELDS = ['seed', 'grid_size', 'words', 'grid', 'answer_key', 'shape', 'density', 'difficulty']
+
+# Set in each worker by _init_worker so the word list is sent once per process
+_word_list = None
+
+
+def _init_worker(word_list):
+    global _word_list
+    _word_list = word_list
+
+
+def _generate(seed, grid_size, words, difficulty=None, pack=None, shape=None):
+    # One puzzle from `words` words drawn from the worker's word list. The seed
+    # picks the words and drives placement, so a seed always gives the same board.
+    # With pack (seconds), as many words of the whole list as fit are packed in.
+    if pack is not None:
+        return pack_puzzle(_word_list, grid_size, pack, seed=seed, shape=shape)
+    word_list = random.Random(seed).sample(_word_list, min(words, len(_word_list)))
+    return generate_puzzle(word_list, grid_size, seed=seed, difficulty=difficulty, shape=shape)
+
+
+def generate_puzzles(word_list, grid_size, count, seed=0, words=8, workers=None, difficulty=None, pack=None,
+                     shape=None):
+    # Yields `count` puzzles as workers finish them, in completion order. At most a
+    # few tasks per worker are in flight, so memory stays flat however many
+    # puzzles are asked for. Seeds that can't be placed are skipped; after `count`
+    # failures it gives up.
+    workers = workers or os.cpu_count() or 1
+    window = workers * 4
+    next_seed = seed
+    produced = failures = 0
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(word_list,)) as executor:
+        running = set()
+        while produced < count:
+            while len(running) < min(window, count - produced) and failures < count:
+                running.add(executor.submit(_generate, next_seed, grid_size, words, difficulty, pack, shape))
+                next_seed += 1
+            if not running:
+                break
+            done, running = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                puzzle = future.result()
+                if puzzle is None:
+                    failures += 1
+                elif produced < count:
+                    produced += 1
+                    yield puzzle
+        for future in running:
+            future.cancel()
+    if produced < count:
+        raise RuntimeError(f"only {produced} of {count} puzzles could be generated "
+                           f"({failures} seeds failed); try a larger grid or fewer words")
+
+
+def write_jsonl(puzzles, out):
+    for puzzle in puzzles:
+        out.write(json.dumps(puzzle) + '\n')
+        out.flush()
+
+
+def write_csv(puzzles, out):
+    # One row per puzzle: grid rows joined with '/', words with ';', and the
+    # answer key (word -> [[row, col], ...]) and difficulty scores as JSON. The
+    # shape, density and difficulty columns are empty for boards without them.
+    writer = csv.DictWriter(out, fieldnames=CSV_FIELDS)
+    writer.writeheader()
+    for puzzle in puzzles:
+        writer.writerow({
+            'seed': puzzle['seed'],
+            'grid_size': puzzle['grid_size'],
+            'words': ';'.join(word for word, _ in puzzle['words']),
+            'grid': '/'.join(puzzle['grid']),
+            'answer_key': json.dumps(puzzle['placements']),
+            'shape': puzzle.get('shape') or '',
+            'density': puzzle.get('density', ''),
+            'difficulty': json.dumps(puzzle['difficulty']) if 'difficulty' in puzzle else '',
+        })
+        out.flush()
+
+
+def generate_command(args):
+    longest = args.grid_size
+    if args.shape:
+        try:
+            mask = make_mask(args.shape, args.grid_size)
+        except (TypeError, ValueError) as error:
+            sys.exit(str(error))
+        longest = max(mask.rows, mask.cols)
+    # Words longer than the board's longest line could never be placed
+    report = ImportReport()
+    word_list = read_word_list(args.word_list, longest, report, args.input_format)
+    if report.rejected:
+        print(report, file=sys.stderr)
+    if not word_list:
+        sys.exit(f"{args.word_list} has no words")
+    out = sys.stdout if args.output == '-' else open(args.output, 'w', newline='', encoding='utf-8')
+    write = write_csv if args.format == 'csv' else write_jsonl
+    start = time.perf_counter()
+    try:
+        write(generate_puzzles(word_list, args.grid_size, args.count, args.seed, args.words, args.workers,
+                               args.difficulty, args.pack, args.shape), out)
+    except RuntimeError as error:
+        sys.exit(str(error))
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    print(f"Generated {args.count} puzzles in {time.perf_counter() - start:.2f}s", file=sys.stderr)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python cli.py', description="Word search tools that don't need pygame")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    generate = commands.add_parser('generate', help="generate puzzles with answer keys on all cores")
+    generate.add_argument("word_list", help="CSV, TSV or JSONL word/definition file")
+    generate.add_argument("--input-format", choices=FORMATS, default=None,
+                          help="format of the word list (default: from its extension, else TSV)")
+    generate.add_argument("--grid-size", type=int, default=14)
+    generate.add_argument("--count", type=int, default=1)
+    generate.add_argument("--seed", type=int, default=0, help="first seed; every puzzle records the seed that made it")
+    generate.add_argument("--words", type=int, default=8, help="words per puzzle, drawn from the list")
+    generate.add_argument("--workers", type=int, default=None, help="default: one per core")
+    generate.add_argument("--difficulty", choices=list(DIFFICULTIES), default=None,
+                          help="build every board to this difficulty target")
+    generate.add_argument("--pack", type=float, default=None, metavar='SECONDS',
+                          help="pack as many words of the list as fit in this long, instead of --words")
+    generate.add_argument("--shape", default=None,
+                          help="board shape: circle, heart, diamond, letter:A-Z or ROWSxCOLS (default: square)")
+    generate.add_argument("--format", choices=['jsonl', 'csv'], default='jsonl')
+    generate.add_argument("-o", "--output", default='-', help="output file (default: stdout)")
+    generate.set_defaults(handler=generate_command)
+
+    args = parser.parse_args(argv)
+    args.handler(args)
+
+
+if __name__ == "__main__":
+    main()
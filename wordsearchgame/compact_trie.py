@@ -0,0 +1,207 @@
+from array import array
+from bisect import bisect_left
+
+NOT_A_WORD = -1
+NO_DEFINITION = -2
+
+
+class CompactNode:
+    # Read-only view of one packed node with the same attributes as puzzle.TrieNode,
+    # so code that walks trie.root (grid_solver, print_trie) works on either trie
+    __slots__ = ('trie', 'index')
+
+    def __init__(self, trie, index):
+        self.trie = trie
+        self.index = index
+
+    @property
+    def children(self):
+        return _Children(self.trie, self.index)
+
+    @property
+    def is_end_of_word(self):
+        return self.trie._value[self.index] != NOT_A_WORD
+
+    @property
+    def definition(self):
+        return self.trie._definition(self.trie._value[self.index])
+
+
+class _Children:
+    __slots__ = ('trie', 'index')
+
+    def __init__(self, trie, index):
+        self.trie = trie
+        self.index = index
+
+    def get(self, char, default=None):
+        child = self.trie._child(self.index, char)
+        return default if child is None else CompactNode(self.trie, child)
+
+    def __getitem__(self, char):
+        child = self.get(char)
+        if child is None:
+            raise KeyError(char)
+        return child
+
+    def __contains__(self, char):
+        return self.trie._child(self.index, char) is not None
+
+    def __len__(self):
+        return self.trie._count[self.index]
+
+    def items(self):
+        trie = self.trie
+        first = trie._first[self.index]
+        for child in range(first, first + trie._count[self.index]):
+            yield chr(trie._labels[child]), CompactNode(trie, child)
+
+
+class CompactTrie:
+    # Drop-in replacement for puzzle.Trie for large dictionaries. Nodes live in flat
+    # arrays in breadth-first order, so the children of a node are one contiguous,
+    # label-sorted run found by binary search:
+    #   _labels[n]  code point of the letter leading into node n
+    #   _first[n]   index of n's first child, _count[n] how many children it has
+    #   _value[n]   NOT_A_WORD, NO_DEFINITION, or an index into the definition table
+    # Definitions are UTF-8 in one bytes pool, definition k being
+    # _pool[_offsets[k]:_offsets[k + 1]]. That is about 14 bytes per node instead of
+    # a dict and an object. insert() queues words and the arrays are rebuilt on the
+    # next lookup, so load a dictionary with a run of inserts before searching it.
+    # As with puzzle.Trie, insert() returns whether the word is new, and inserting
+    # a word again replaces its definition unless replace=False.
+    def __init__(self, words=()):
+        self._labels = array('I', [0])
+        self._first = array('I', [1])
+        self._count = array('I', [0])
+        self._value = array('i', [NOT_A_WORD])
+        self._offsets = array('I', [0])
+        self._pool = b''
+        self._pending = {}
+        for word, definition in words:
+            self.insert(word, definition)
+
+    @classmethod
+    def from_arrays(cls, labels, first, count, value, offsets, pool):
+        # Wraps already packed arrays; any sequences of ints work, including
+        # memoryviews cast over a mapped dictionary file
+        trie = cls()
+        trie._labels, trie._first, trie._count, trie._value = labels, first, count, value
+        trie._offsets, trie._pool = offsets, pool
+        return trie
+
+    def arrays(self):
+        # The packed (labels, first, count, value, offsets, pool), for writing to disk
+        self._pack()
+        return self._labels, self._first, self._count, self._value, self._offsets, self._pool
+
+    @property
+    def root(self):
+        self._pack()
+        return CompactNode(self, 0)
+
+    def insert(self, word, definition=None, replace=True):
+        # Checks the queue and the arrays as they are, without repacking
+        new = word not in self._pending and self._packed_value(word) == NOT_A_WORD
+        if new or replace:
+            self._pending[word] = definition
+        return new
+
+    def search(self, word):
+        self._pack()
+        value = self._packed_value(word)
+        return value != NOT_A_WORD, self._definition(value)
+
+    def _packed_value(self, word):
+        node = 0
+        for char in word:
+            node = self._child(node, char)
+            if node is None:
+                return NOT_A_WORD
+        return self._value[node]
+
+    def get_all_words(self):
+        self._pack()
+        words = []
+        self._get_all_words_recursive(0, "", words)
+        return words
+
+    def _get_all_words_recursive(self, node, current_word, words):
+        value = self._value[node]
+        if value != NOT_A_WORD:
+            words.append((current_word, self._definition(value)))
+        first = self._first[node]
+        for child in range(first, first + self._count[node]):
+            self._get_all_words_recursive(child, current_word + chr(self._labels[child]), words)
+
+    def _child(self, node, char):
+        first = self._first[node]
+        end = first + self._count[node]
+        code = ord(char)
+        child = bisect_left(self._labels, code, first, end)
+        if child < end and self._labels[child] == code:
+            return child
+        return None
+
+    def _definition(self, value):
+        if value < 0:
+            return None
+        return bytes(self._pool[self._offsets[value]:self._offsets[value + 1]]).decode('utf-8')
+
+    def _pack(self):
+        # Builds the arrays straight from the sorted words, one trie level at a time:
+        # the nodes at depth d are the distinct d-letter prefixes in sorted order,
+        # which is exactly breadth-first order with label-sorted children. Each node
+        # is tracked as the [lo, hi) run of sorted words sharing its prefix, so no
+        # node objects are ever created.
+        if not self._pending:
+            return
+        words = dict(self._packed_words())
+        words.update(self._pending)
+        self._pending = {}
+        items = sorted(words.items())
+
+        labels = array('I', [0])
+        first = array('I')
+        count = array('I')
+        value = array('i')
+        offsets = array('I', [0])
+        pool = bytearray()
+        level = [(0, len(items))]
+        depth = 0
+        while level:
+            next_level = []
+            base = len(value) + len(level)  # index of the first node one level down
+            for lo, hi in level:
+                if lo < hi and len(items[lo][0]) == depth:
+                    definition = items[lo][1]
+                    if definition is None:
+                        value.append(NO_DEFINITION)
+                    else:
+                        value.append(len(offsets) - 1)
+                        pool += definition.encode('utf-8')
+                        offsets.append(len(pool))
+                    lo += 1
+                else:
+                    value.append(NOT_A_WORD)
+                first.append(base + len(next_level))
+                children = len(next_level)
+                while lo < hi:
+                    char = items[lo][0][depth]
+                    end = lo + 1
+                    while end < hi and items[end][0][depth] == char:
+                        end += 1
+                    labels.append(ord(char))
+                    next_level.append((lo, end))
+                    lo = end
+                count.append(len(next_level) - children)
+            level = next_level
+            depth += 1
+        self._labels, self._first, self._count, self._value = labels, first, count, value
+        self._offsets, self._pool = offsets, bytes(pool)
+
+    def _packed_words(self):
+        # Words already in the arrays, leaving queued inserts alone
+        words = []
+        self._get_all_words_recursive(0, "", words)
+        return words
@@ -0,0 +1,168 @@
+import mmap
+import os
+import struct
+import sys
+from array import array
+from collections.abc import Sequence
+
+from compact_trie import NO_DEFINITION, CompactTrie
+from puzzle import WORD_LISTS
+
+# Built by build_dictionary.py; the games fall back to puzzle.WORD_LISTS without it
+DICTIONARY_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'words.dict')
+
+# File layout, all integers little-endian:
+#   header   magic, node count, definition count, pool bytes, theme count,
+#            entry count, word bytes
+#   labels, first, count, value   one 4-byte int per trie node (see CompactTrie)
+#   offsets  definition count + 1 4-byte ints into the pool
+#   themes   theme count + 1 4-byte ints: theme t is entries themes[t]:themes[t + 1]
+#   words    entry count + 1 4-byte ints into the word bytes, one per entry
+#   meanings entry count 4-byte ints: each entry's definition, or NO_DEFINITION
+#   pool     UTF-8 definitions
+#   word bytes  UTF-8 words of every entry, back to back
+# An entry is one (word, definition) of a theme, so a word in several themes
+# keeps each theme's definition; the trie holds the last one written.
+MAGIC = b'WSDICT02'
+HEADER = struct.Struct('<8sIIIIII')
+
+
+def write_dictionary(path, word_lists):
+    # word_lists is a list of themed [(word, definition), ...] lists, as in
+    # puzzle.WORD_LISTS. Every word goes into one trie; the themes keep the lists,
+    # empty ones included, so theme numbers match positions in word_lists.
+    trie = CompactTrie(pair for word_list in word_lists for pair in word_list)
+    labels, first, count, value, offsets, pool = trie.arrays()
+    offsets = array('I', offsets)
+    pool = bytearray(pool)
+    definition_ids = {}
+    for k in range(len(offsets) - 1):
+        definition_ids.setdefault(bytes(pool[offsets[k]:offsets[k + 1]]), k)
+    themes = array('I', [0])
+    words = array('I', [0])
+    meanings = array('i')
+    word_bytes = bytearray()
+    for word_list in word_lists:
+        for word, definition in word_list:
+            word_bytes += word.encode('utf-8')
+            words.append(len(word_bytes))
+            if definition is None:
+                meanings.append(NO_DEFINITION)
+                continue
+            encoded = definition.encode('utf-8')
+            if encoded not in definition_ids:
+                definition_ids[encoded] = len(offsets) - 1
+                pool += encoded
+                offsets.append(len(pool))
+            meanings.append(definition_ids[encoded])
+        themes.append(len(meanings))
+    tables = [array('I', labels), array('I', first), array('I', count), array('i', value), offsets, themes, words,
+              meanings]
+    if sys.byteorder != 'little':
+        for table in tables:
+            table.byteswap()
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, len(labels), len(offsets) - 1, len(pool), len(word_lists), len(meanings),
+                            len(word_bytes)))
+        for table in tables:
+            table.tofile(f)
+        f.write(pool)
+        f.write(word_bytes)
+    os.replace(tmp_path, path)
+
+
+class Themes(Sequence):
+    # The themed [(word, definition), ...] lists of a Dictionary, read from the
+    # mapping only when one is asked for, so opening a dictionary never decodes
+    # its themes and random.choice() or indexing decodes just the one it picks.
+    def __init__(self, dictionary):
+        self._dictionary = dictionary
+
+    def __len__(self):
+        return len(self._dictionary._themes) - 1
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("theme index out of range")
+        return self._dictionary.theme(index)
+
+
+class Dictionary:
+    # A dictionary file mapped read-only. The trie arrays, definitions and themes
+    # are memoryviews straight over the mapping, so opening costs the same for ten
+    # words or a million, and processes forked after opening share the pages
+    # instead of copying them. Words are looked up and defined through `trie`.
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, nodes, definitions, pool_size, themes, entries, words_size = HEADER.unpack_from(self._map)
+        if magic != MAGIC:
+            self._map.close()
+            raise ValueError(f"{path} is not a word search dictionary file of this version; "
+                             f"rebuild it with build_dictionary.py")
+        self._views = []
+        position = HEADER.size
+        tables = []
+        for code, length in (('I', nodes), ('I', nodes), ('I', nodes), ('i', nodes), ('I', definitions + 1),
+                             ('I', themes + 1), ('I', entries + 1), ('i', entries)):
+            tables.append(self._table(code, position, length))
+            position += 4 * length
+        self._offsets, self._themes, self._words, self._meanings = tables[4:]
+        self._pool = self._view(position, position + pool_size)
+        position += pool_size
+        self._word_bytes = self._view(position, position + words_size)
+        self.trie = CompactTrie.from_arrays(*tables[:5], self._pool)
+        self.word_lists = Themes(self)
+
+    def _view(self, start, stop):
+        view = memoryview(self._map)[start:stop]
+        self._views.append(view)
+        return view
+
+    def _table(self, code, start, length):
+        view = self._view(start, start + 4 * length)
+        if sys.byteorder != 'little':
+            table = array(code, view)
+            table.byteswap()
+            return table
+        table = view.cast(code)
+        self._views.append(table)
+        return table
+
+    def definition(self, k):
+        if k < 0:
+            return None
+        return bytes(self._pool[self._offsets[k]:self._offsets[k + 1]]).decode('utf-8')
+
+    def theme(self, index):
+        # Theme `index` as a [(word, definition), ...] list, with the definitions it
+        # was built with
+        words, word_bytes = self._words, self._word_bytes
+        return [(bytes(word_bytes[words[i]:words[i + 1]]).decode('utf-8'), self.definition(self._meanings[i]))
+                for i in range(self._themes[index], self._themes[index + 1])]
+
+    def close(self):
+        self.trie = None
+        self.word_lists = None
+        self._offsets = self._themes = self._words = self._meanings = self._pool = self._word_bytes = None
+        for view in reversed(self._views):
+            view.release()
+        self._views = []
+        self._map.close()
+
+
+def open_dictionary(path=DICTIONARY_PATH):
+    return Dictionary(path)
+
+
+def load_word_lists(path=DICTIONARY_PATH):
+    # Themed word lists from the prebuilt dictionary (a lazy Themes sequence), or
+    # the built-in lists when no dictionary has been built
+    if not os.path.exists(path):
+        return WORD_LISTS
+    return open_dictionary(path).word_lists
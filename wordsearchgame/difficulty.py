@@ -0,0 +1,230 @@
+from compact_trie import CompactTrie
+from grid_solver import find_words
+from placement import DIRECTIONS, EMPTY, PlacementSolver, affine_order
+
+HORIZONTAL = 'horizontal'
+VERTICAL = 'vertical'
+DIAGONAL = 'diagonal'
+KINDS = (HORIZONTAL, VERTICAL, DIAGONAL)
+
+
+def direction_kind(dr, dc):
+    if dr == 0:
+        return HORIZONTAL
+    if dc == 0:
+        return VERTICAL
+    return DIAGONAL
+
+
+def is_reversed(dr, dc):
+    # Read right to left, or bottom to top when the line is vertical
+    return dc < 0 or (dc == 0 and dr < 0)
+
+
+def shares(weights, count):
+    # Splits count into whole shares proportional to weights (largest remainder)
+    total = sum(weights.values())
+    exact = {key: count * weight / total for key, weight in weights.items()}
+    result = {key: int(value) for key, value in exact.items()}
+    for key in sorted(exact, key=lambda key: exact[key] - result[key], reverse=True)[:count - sum(result.values())]:
+        result[key] += 1
+    return result
+
+
+class DifficultyTarget:
+    # What a board of some difficulty looks like: the share of words along each
+    # kind of line (mix, e.g. {'horizontal': 0.5, 'vertical': 0.5}), the share
+    # read backwards, how many cells words share, and how confusable the filler is
+    # (0 is uniform letters; 1 draws them like the words and plants decoys, the
+    # words minus their last letter, in the blanks).
+    def __init__(self, mix, reversal_rate=0.0, overlaps=0, confusability=0.0):
+        unknown = set(mix) - set(KINDS)
+        if unknown:
+            raise ValueError(f"unknown direction kinds {sorted(unknown)}; use {', '.join(KINDS)}")
+        if not any(mix.values()):
+            raise ValueError("the direction mix needs at least one kind with a share")
+        self.mix = dict(mix)
+        self.reversal_rate = reversal_rate
+        self.overlaps = overlaps
+        self.confusability = confusability
+
+    def quotas(self, count):
+        # How many of `count` words go along each kind of line and backwards
+        return shares(self.mix, count), round(self.reversal_rate * count)
+
+    def score(self, count):
+        kinds, reversed_words = self.quotas(count)
+        return difficulty_score(kinds.get(DIAGONAL, 0), reversed_words, self.overlaps, count,
+                                self.confusability)
+
+
+DIFFICULTIES = {
+    'easy': DifficultyTarget({HORIZONTAL: 0.6, VERTICAL: 0.4}),
+    'medium': DifficultyTarget({HORIZONTAL: 0.4, VERTICAL: 0.3, DIAGONAL: 0.3}, reversal_rate=0.25, overlaps=1,
+                               confusability=0.5),
+    'hard': DifficultyTarget({HORIZONTAL: 0.2, VERTICAL: 0.3, DIAGONAL: 0.5}, reversal_rate=0.5, overlaps=3,
+                             confusability=1.0),
+}
+
+
+def get_target(difficulty):
+    # A DifficultyTarget from one or the name of one in DIFFICULTIES
+    if isinstance(difficulty, DifficultyTarget):
+        return difficulty
+    try:
+        return DIFFICULTIES[difficulty]
+    except KeyError:
+        raise ValueError(f"unknown difficulty {difficulty!r}; use {', '.join(DIFFICULTIES)}") from None
+
+
+def difficulty_score(diagonal, reversed_words, overlaps, count, confusability):
+    # 0 (every word forwards along a row or column in plain noise) to 1. Diagonal
+    # and backwards words count most, as they are what players miss.
+    if not count:
+        return 0.0
+    return round(0.35 * diagonal / count + 0.35 * reversed_words / count
+                 + 0.15 * min(1.0, overlaps / count) + 0.15 * confusability, 3)
+
+
+class DifficultyScore:
+    # Running tally of a board being built, updated on every placement and undo
+    def __init__(self, count, confusability):
+        self.count = count
+        self.confusability = confusability
+        self.kinds = dict.fromkeys(KINDS, 0)
+        self.reversed = 0
+        self.overlaps = 0
+
+    def add(self, kind, backwards, overlaps, sign=1):
+        self.kinds[kind] += sign
+        self.reversed += sign * backwards
+        self.overlaps += sign * overlaps
+
+    def value(self):
+        return difficulty_score(self.kinds[DIAGONAL], self.reversed, self.overlaps, self.count, self.confusability)
+
+    def as_dict(self):
+        return {'score': self.value(), 'kinds': dict(self.kinds), 'reversed': self.reversed,
+                'overlaps': self.overlaps, 'confusability': self.confusability}
+
+
+class TargetedSolver(PlacementSolver):
+    # Places words so the board lands on a DifficultyTarget instead of wherever
+    # the search happens to end. Longest words go first; each only tries slots
+    # along a kind of line, and in a reading direction, that still has quota
+    # left, so the mix and reversal rate come out exact. Overlapping slots are
+    # tried first while the board is short of the overlap target and last once
+    # it is met, and a branch is dropped as soon as the words left could not
+    # make up the missing overlaps. score holds the running DifficultyScore.
+    def __init__(self, board, words, target, rng=None, max_backtracks=None, stats=None, deadline=None):
+        super().__init__(board, words, rng, max_backtracks=max_backtracks, stats=stats, deadline=deadline)
+        self.target = target
+        self.score = DifficultyScore(len(self.words), target.confusability)
+
+    def _groups(self, length):
+        # Slot indices of this length by (kind, reversed)
+        groups = {}
+        for index, (dr, dc) in enumerate(self.board.table.slot_directions(length)):
+            groups.setdefault((direction_kind(dr, dc), is_reversed(dr, dc)), []).append(index)
+        return groups
+
+    def _search(self, encoded):
+        board = self.board
+        rng = self.rng
+        score = self.score
+        stats = self.stats
+        order = sorted(range(len(encoded)), key=lambda i: -len(encoded[i]))
+        kinds_left, reversed_left = self.target.quotas(len(encoded))
+        groups = {len(word): self._groups(len(word)) for word in encoded}
+        # Most overlaps the words from position k on could still add
+        reachable = [0] * (len(order) + 1)
+        for k in range(len(order) - 1, -1, -1):
+            reachable[k] = reachable[k + 1] + len(encoded[order[k]]) - 1
+        chosen = [None] * len(encoded)
+
+        def options(word, remaining):
+            slots = board.table.slots(len(word))
+            allowed = [group for (kind, backwards), group in groups[len(word)].items()
+                       if kinds_left.get(kind) and (reversed_left > 0 if backwards else reversed_left < remaining)]
+            indices = [index for group in allowed for index in group]
+            fitting = []
+            for k in affine_order(len(indices), rng):
+                slot = slots[indices[k]]
+                if board.fits(word, slot):
+                    shared = len(word) - board.cells[slot].count(EMPTY)
+                    if shared < len(word):
+                        fitting.append((shared, slot, indices[k]))
+            short = score.overlaps < self.target.overlaps
+            fitting.sort(key=lambda option: -option[0] if short else option[0])
+            return fitting
+
+        def backtrack(k):
+            nonlocal reversed_left
+            self._entered(k)
+            if k == len(order):
+                return True
+            if score.overlaps + reachable[k] < self.target.overlaps:
+                return False
+            index = order[k]
+            word = encoded[index]
+            directions = board.table.slot_directions(len(word))
+            for shared, slot, slot_index in options(word, len(order) - k):
+                kind, backwards = direction_kind(*directions[slot_index]), is_reversed(*directions[slot_index])
+                board.place(word, slot)
+                stats.assignments += 1
+                kinds_left[kind] -= 1
+                reversed_left -= backwards
+                score.add(kind, backwards, shared)
+                chosen[index] = slot
+                if backtrack(k + 1):
+                    return True
+                score.add(kind, backwards, shared, sign=-1)
+                reversed_left += backwards
+                kinds_left[kind] += 1
+                board.undo()
+                self._backtracked()
+            return False
+
+        return chosen if backtrack(0) else None
+
+
+def plant_decoys(grid, placements, rng, count, trie=None):
+    # Writes up to `count` decoys, placed words minus their last letter, into
+    # blank lines of grid (a list of row lists) ahead of fill_blanks. The cell
+    # that would complete a decoy must be blank or off the board, and a decoy
+    # that spells a placed word again together with other letters is taken back
+    # out, since fill_blanks can only re-roll blank cells. trie is an empty trie
+    # to index the words in. Returns the number of decoys left in the grid.
+    rows, cols = len(grid), len(grid[0])
+    words = [word for word in placements if len(word) >= 4]
+    decoys = []
+    for _ in range(count * 4):
+        if len(decoys) == count or not words:
+            break
+        word = rng.choice(words)
+        dr, dc = rng.choice(DIRECTIONS)
+        row, col = rng.randrange(rows), rng.randrange(cols)
+        length = len(word) - 1
+        cells = [(row + i * dr, col + i * dc) for i in range(length)]
+        end_row, end_col = row + length * dr, col + length * dc
+        if not all(0 <= i < rows and 0 <= j < cols and grid[i][j] == ' ' for i, j in cells):
+            continue
+        if 0 <= end_row < rows and 0 <= end_col < cols and grid[end_row][end_col] != ' ':
+            continue
+        for (i, j), letter in zip(cells, word):
+            grid[i][j] = letter
+        decoys.append(cells)
+    trie = trie if trie is not None else CompactTrie()
+    for word in placements:
+        trie.insert(word)
+    placed = {word: frozenset(cells) for word, cells in placements.items()}
+    while decoys:
+        spelled = [frozenset(path) for word, path in find_words(grid, trie) if placed.get(word) != frozenset(path)]
+        clashing = [cells for cells in decoys if any(path.intersection(cells) for path in spelled)]
+        if not clashing:
+            break
+        for cells in clashing:
+            decoys.remove(cells)
+            for i, j in cells:
+                grid[i][j] = ' '
+    return len(decoys)
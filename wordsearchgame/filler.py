@@ -0,0 +1,63 @@
+import random
+import string
+from collections import Counter
+from itertools import accumulate
+
+from compact_trie import CompactTrie
+from grid_solver import find_words
+
+# Words that must never show up in the filler
+BANNED_WORDS = ('ASS', 'BITCH', 'COCK', 'CUNT', 'DICK', 'FUCK', 'PISS', 'SHIT', 'SLUT', 'TWAT', 'WHORE')
+
+MAX_REROLLS = 50
+
+
+def letter_weights(words, alphabet=string.ascii_uppercase, confusability=1.0):
+    # Cumulative weights for drawing filler letters: how often each letter occurs in
+    # the placed words, plus one so every letter can still come up. Filler that
+    # looks like the words makes them harder to spot than uniform noise does;
+    # confusability scales the word counts down, to uniform filler at 0.
+    counts = Counter(''.join(words).upper())
+    return list(accumulate(confusability * counts[letter] + 1 for letter in alphabet))
+
+
+def fill_blanks(grid, placements, rng=random, trie=None, banned=BANNED_WORDS, alphabet=string.ascii_uppercase,
+                confusability=1.0):
+    # Fills every ' ' cell of grid (a list of row lists) in place. placements maps
+    # each placed word to its cells. All blanks are drawn in a single choices()
+    # call, then one scan over all eight directions finds filler that spells a
+    # placed word a second time or a banned word, and only the blank cells on those
+    # lines are drawn again. trie is an empty trie to index the words in; the
+    # caller's own dict-based Trie walks faster than the default CompactTrie.
+    # Words read inside a single placed word (FICTION in NONFICTION) come with
+    # the word list and are let be. Returns the number of re-roll rounds needed,
+    # or None when the board still spells a placed word twice or a banned word:
+    # either only placed letters spell it, which no re-roll can change, or it
+    # survived MAX_REROLLS rounds. The caller should place the words again.
+    blanks = [(i, j) for i, row in enumerate(grid) for j, letter in enumerate(row) if letter == ' ']
+    if not blanks:
+        return 0
+    cum_weights = letter_weights(placements, alphabet, confusability)
+    blank_set = set(blanks)
+    trie = trie if trie is not None else CompactTrie()
+    for word in list(placements) + list(banned):
+        trie.insert(word)
+    placed = {word: frozenset(cells) for word, cells in placements.items()}
+    cells = blanks
+    for rounds in range(MAX_REROLLS):
+        for (i, j), letter in zip(cells, rng.choices(alphabet, cum_weights=cum_weights, k=len(cells))):
+            grid[i][j] = letter
+        offending = set()
+        for word, path in find_words(grid, trie):
+            path = frozenset(path)
+            if len(word) < 2 or placed.get(word) == path:
+                continue
+            filler = path & blank_set
+            if filler:
+                offending.update(filler)
+            elif not any(path <= word_cells for word_cells in placed.values()):
+                return None
+        if not offending:
+            return rounds
+        cells = sorted(offending)
+    return None
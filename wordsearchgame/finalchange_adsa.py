@@ -1,10 +1,19 @@
 import sys
+import math
 import random
-import string
 import time
-import requests
 import pygame
 import pygame.time
+from puzzle import Trie, WordSearchCSP, LineIndex
+from animation import Timeline, Tween
+from board_renderer import FRAME_RATE, BoardRenderer
+from render_cache import cell_rects, glyph_atlas, render_text
+from word_events import WordFoundEmitter
+from dictionary_file import load_word_lists
+from shapes import BLOCKED
+
+# Search budget for placing the words before asking for another grid size
+MAX_BACKTRACKS = 20000
 
 
 BLACK = (0, 0, 0)
@@ -15,162 +24,7 @@ GREEN = (0, 255, 0)
 LIGHT_GRAY = (240, 240, 240)
 
 SCREEN = None
-
-class TrieNode:
-    def __init__(self):
-        self.children = {}
-        self.definition = None
-        self.is_end_of_word = False
-        
-class Trie:
-    def __init__(self):
-        self.root = TrieNode()
-
-    def insert(self, word, definition=None):
-        node = self.root
-        for char in word:
-            if char not in node.children:
-                node.children[char] = TrieNode()
-            node = node.children[char]
-        node.is_end_of_word = True
-        node.definition = definition
-
-    def search(self, word):
-        current = self.root
-        for char in word:
-            if char not in current.children:
-                return False, None
-            current = current.children[char]
-        return current.is_end_of_word, current.definition
-
-    def get_all_words(self):
-        words = []
-        self._get_all_words_recursive(self.root, "", words)
-        return words
-
-    def _get_all_words_recursive(self, node, current_word, words):
-        if node.is_end_of_word:
-            words.append((current_word, node.definition))
-        for char, child_node in node.children.items():
-            self._get_all_words_recursive(child_node, current_word + char, words)
-    
-class WordSearchGraph:
-    def __init__(self, grid):
-        self.grid = grid
-        self.rows = len(grid)
-        self.cols = len(grid[0])
-        self.graph = {}
-
-    def add_edge(self, node1, node2):
-        if node1 in self.graph:
-            self.graph[node1].append(node2)
-        else:
-            self.graph[node1] = [node2]
-
-    def build_graph(self):
-        for i in range(self.rows):
-            for j in range(self.cols):
-                current_node = (i, j)
-
-                for ni, nj in [(i + 1, j), (i - 1, j), (i, j + 1), (i, j - 1)]:
-                    if 0 <= ni < self.rows and 0 <= nj < self.cols:
-                        neighbor_node = (ni, nj)
-                        self.add_edge(current_node, neighbor_node)
-
-                for ni, nj in [(i + 1, j + 1), (i - 1, j - 1), (i - 1, j + 1), (i + 1, j - 1)]:
-                    if 0 <= ni < self.rows and 0 <= nj < self.cols:
-                        neighbor_node = (ni, nj)
-                        self.add_edge(current_node, neighbor_node)
-
-    def fill_empty_spaces(self):
-        for i in range(self.rows):
-            for j in range(self.cols):
-                if self.grid[i][j] == ' ':
-                    self.grid[i][j] = random.choice(string.ascii_uppercase)
-
-    def word_search_csp(self, words, index=0):
-        if index == len(words):
-            return True
-
-        word, _ = words[index]
-        nodes = [(i, j) for i in range(self.rows) for j in range(self.cols)]
-        random.shuffle(nodes)
-        for node in nodes:
-            for direction in ['diagonal','horizontal','vertical']:
-                for orientation in [1, -1]:
-                    if self.is_valid_assignment(word, node, direction, orientation):
-                        self.assign_word(word, node, direction, orientation)
-                        if self.word_search_csp(words, index + 1):
-                            return True
-                        self.unassign_word(word, node, direction, orientation)
-        return False
-
-    def is_valid_assignment(self, word, node, direction, orientation):
-        if direction == 'horizontal':
-            return all(0 <= node[1] + i * orientation < self.cols and
-                       (self.grid[node[0]][node[1] + i * orientation] == ' ' or
-                        self.grid[node[0]][node[1] + i * orientation] == word[i]) for i in range(len(word)))
-        elif direction == 'vertical':
-            return all(0 <= node[0] + i * orientation < self.rows and
-                       (self.grid[node[0] + i * orientation][node[1]] == ' ' or
-                        self.grid[node[0] + i * orientation][node[1]] == word[i]) for i in range(len(word)))
-        elif direction == 'diagonal':
-            return all(0 <= node[0] + i * orientation < self.rows and
-                       0 <= node[1] + i * orientation < self.cols and
-                       (self.grid[node[0] + i * orientation][node[1] + i * orientation] == ' ' or
-                        self.grid[node[0] + i * orientation][node[1] + i * orientation] == word[i]) for i in range(len(word)))
-        return False
-
-    def assign_word(self, word, node, direction, orientation):
-        if direction == 'horizontal':
-            a = random.choice([0, 1])
-            for i in range(len(word)):
-                if a == 0:
-                    self.grid[node[0]][node[1] + i * orientation] = word[-i - 1]
-                if a == 1:
-                    self.grid[node[0]][node[1] + i * orientation] = word[i]
-        elif direction == 'vertical':
-            a = random.choice([0, 1])
-            for i in range(len(word)):
-                if a == 0:
-                    self.grid[node[0] + i * orientation][node[1]] = word[-i - 1]
-                if a == 1:
-                    self.grid[node[0] + i * orientation][node[1]] = word[i]
-        elif direction == 'diagonal':
-            a = random.choice([0, 1])
-            for i in range(len(word)):
-                if a == 0:
-                    self.grid[node[0] + i * orientation][node[1] + i * orientation] = word[-i - 1]
-                if a == 1:
-                    self.grid[node[0] + i * orientation][node[1] + i * orientation] = word[i]
-
-    def unassign_word(self, word, node, direction, orientation):
-        if direction == 'horizontal' or direction == 'vertical':
-            for i in range(len(word)):
-                row = node[0]
-                col = node[1] + i * orientation
-                if 0 <= row < self.rows and 0 <= col < self.cols:
-                    self.grid[row][col] = ' '
-        elif direction == 'diagonal':
-            for i in range(len(word)):
-                row = node[0] + i * orientation
-                col = node[1] + i * orientation
-                if 0 <= row < self.rows and 0 <= col < self.cols:
-                    self.grid[row][col] = ' '
-
-class WordSearchCSP:
-    def __init__(self, grid_size, trie):
-        self.grid_size = grid_size
-        self.word_search_graph = WordSearchGraph([[' ' for _ in range(grid_size)] for _ in range(grid_size)])
-        self.trie = trie
-        self.words = trie.get_all_words()
-
-    def solve(self):
-        return self.word_search_graph.word_search_csp(self.words)
-
-    def display_grid(self):
-        for row in self.word_search_graph.grid:
-            print(' '.join(row))
+WORD_EVENTS = None
 
 def draw_grid(grid, selected_cells, found_word_cells, score, time_left):
     if not grid:
@@ -181,68 +35,44 @@ def draw_grid(grid, selected_cells, found_word_cells, score, time_left):
     rows = len(grid)
     cols = len(grid[0])
 
-    blockSize = 400 // cols
-    for x in range(0, 400, blockSize):
-        for y in range(0, 400, blockSize):
-            if y // blockSize < rows and x // blockSize < cols:  
-                rect = pygame.Rect(x, y, blockSize, blockSize)
-                if (y // blockSize, x // blockSize) in selected_cells:
-                    pygame.draw.rect(SCREEN, BLUE, rect)
-                elif (y // blockSize, x // blockSize) in found_word_cells:
-                    pygame.draw.rect(SCREEN, GREEN, rect)
-                else:
-                    pygame.draw.rect(SCREEN, WHITE, rect, 1)
+    blockSize = 400 // max(rows, cols)
+    rects = cell_rects(rows, cols, blockSize)
+    for i in range(rows):
+        for j in range(cols):
+            if grid[i][j] == BLOCKED:
+                continue
+            draw_cell(grid, i, j, rects[i][j], selected_cells, found_word_cells)
+
+    display_score(score)
+    display_time_left(time_left)
 
-                text = pygame.font.Font(None, 36).render(grid[y // blockSize][x // blockSize], True, BLACK)
-                text_rect = text.get_rect(center=rect.center)
-                SCREEN.blit(text, text_rect)
 
-    score_text = pygame.font.Font(None, 36).render(f"Score: {score}", True, BLACK)
-    SCREEN.blit(score_text, (450, 50))
-    time_text = pygame.font.Font(None, 36).render(f"Time left: {time_left}s", True, BLACK)
-    SCREEN.blit(time_text, (450, 100))
+def draw_cell(grid, i, j, rect, selected_cells, found_word_cells):
+    if (i, j) in selected_cells:
+        pygame.draw.rect(SCREEN, BLUE, rect)
+    elif (i, j) in found_word_cells:
+        pygame.draw.rect(SCREEN, GREEN, rect)
+    else:
+        pygame.draw.rect(SCREEN, WHITE, rect, 1)
+
+    glyph_atlas(36, (BLACK,)).blit(SCREEN, grid[i][j], BLACK, rect.center)
+
+
+def display_score(score):
+    return SCREEN.blit(render_text(f"Score: {score}", 36, BLACK), (450, 50))
+
+
+def display_time_left(time_left):
+    return SCREEN.blit(render_text(f"Time left: {time_left}s", 36, BLACK), (450, 100))
 
 
 def send_word_to_flask(word, definition):
-    try:
-        response = requests.post('http://127.0.0.1:5000/word_found', json={'word': word, 'definition': definition})
-        response.raise_for_status()
-    except requests.exceptions.RequestException as e:
-        print(f"Error sending word to Flask server: {e}")
-
-
-def find_selected_word(grid, start_pos, end_pos):
-    if not start_pos or not end_pos:
-        return ""
-    start_row, start_col = start_pos
-    end_row, end_col = end_pos
-
-    if start_row == end_row:
-        # Horizontal selection
-        if start_col < end_col:
-            return ''.join(grid[start_row][start_col:end_col + 1])
-        else:
-            return ''.join(grid[start_row][end_col:start_col + 1][::-1])
-    elif start_col == end_col:
-        # Vertical selection
-        if start_row < end_row:
-            return ''.join(grid[row][start_col] for row in range(start_row, end_row + 1))
-        else:
-            return ''.join(grid[row][start_col] for row in range(end_row, start_row + 1)[::-1])
-    elif abs(start_row - end_row) == abs(start_col - end_col):
-        # Diagonal selection
-        if start_row < end_row:
-            if start_col < end_col:
-                return ''.join(grid[start_row + i][start_col + i] for i in range(end_row - start_row + 1))
-            else:
-                return ''.join(grid[start_row + i][start_col - i] for i in range(end_row - start_row + 1))
-        else:
-            if start_col < end_col:
-                return ''.join(grid[start_row - i][start_col + i] for i in range(start_row - end_row + 1))
-            else:
-                return ''.join(grid[start_row - i][start_col - i] for i in range(start_row - end_row + 1))
+    # Only queues the event; WORD_EVENTS posts it in the background in batches
+    global WORD_EVENTS
+    if WORD_EVENTS is None:
+        WORD_EVENTS = WordFoundEmitter()
+    WORD_EVENTS.emit(word, definition)
 
-    return ""
 
 # def handle_user_input():
     
@@ -358,11 +188,12 @@ def handle_user_input():
 
 def display_selected_words(selected_words):
     text_y = 200  # Starting y-coordinate for displaying selected words
+    area = pygame.Rect(450, text_y, 0, 0)
     for word, definition in selected_words:
-        word_text = pygame.font.Font(None, 24).render(f"*{definition}", True, BLACK)
-        SCREEN.blit(word_text, (450, text_y))
+        word_text = render_text(f"*{definition}", 24, BLACK)
+        area.union_ip(SCREEN.blit(word_text, (450, text_y)))
         text_y += 30  # Increment y-coordinate for the next word
-import pygame.time
+    return area
 
 
 def display_gameover_win(score, start_time, total_characters):
@@ -396,52 +227,49 @@ def display_gameover_win(score, start_time, total_characters):
     
     # Update the display
     pygame.display.flip()
-    
-    # Introduce a delay before exiting
-    pygame.time.wait(20000)  # Wait for 20000 milliseconds (20 seconds)
 
 
-def main():
+def wait_on_end_screen(timeline, clock, fps, duration=20000):
+    # Keeps the end screen up for duration ms (20 seconds) while still answering
+    # quit events
+    done = []
+    timeline.after(duration, lambda: done.append(True))
+    while not done:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                pygame.quit()
+                sys.exit()
+        timeline.update()
+        clock.tick(fps)
+
+
+def highlight_found_word(timeline, renderer, found_word_cells, start_pos, cells, duration=250):
+    # Turns the word's cells green one after another, from where the drag started
+    ordered = sorted(cells, key=lambda cell: max(abs(cell[0] - start_pos[0]), abs(cell[1] - start_pos[1])))
+
+    def sweep(progress):
+        for cell in ordered[:math.ceil(progress * len(ordered))]:
+            if cell not in found_word_cells:
+                found_word_cells.add(cell)
+                renderer.invalidate([cell])
+
+    timeline.add(Tween(duration, on_update=sweep))
+
+
+def main(puzzle=None, fps=FRAME_RATE):
+    # puzzle is an optional pre-generated board from puzzle.generate_puzzle(); when
+    # given, the grid size prompt and word placement are skipped. fps caps how
+    # often the loop polls and redraws.
     pygame.init()
     global SCREEN
     SCREEN = pygame.display.set_mode((1200,500))
     pygame.display.set_caption('Word Search')
 
-    # Define multiple sets of words
-    word_lists = [
-        [("ELEPHANT", "A very large plant-eating mammal with a trunk"),
-         ("MONKEY", "A small to medium-sized primate"),
-         ("GIRAFFE", "A tall African mammal with a long neck and legs"),
-         ("ZEBRA", "An African wild horse with black-and-white stripes"),
-         ("RHINOCEROS", "A large, heavily built herbivorous mammal with one or two upright horns on the snout")],
-        [("MOUNTAIN", "A large natural elevation of the earth's surface"),
-         ("VALLEY", "A low area of land between hills or mountains"),
-         ("FOREST", "A large area covered chiefly with trees and undergrowth"),
-         ("RIVER", "A large natural stream of water flowing in a channel"),
-         ("LAKE", "A large body of water surrounded by land")],
-        [("COMPUTER", "An electronic device for storing and processing data"),
-         ("INTERNET", "A global computer network providing a variety of information and communication facilities"),
-         ("SOFTWARE", "The programs and other operating information used by a computer"),
-         ("HARDWARE", "The physical components of a computer system"),
-         ("PROGRAMMING", "The process of writing computer programs")],
-        [("OCEAN", "A very large expanse of sea"),
-         ("SEA", "The expanse of salt water that covers most of the earth's surface"),
-         ("BEACH", "A pebbly or sandy shore, especially by the ocean"),
-         ("WAVE", "A long body of water curling into an arched form and breaking on the shore"),
-         ("TIDE", "The alternate rising and falling of the sea")],
-        [("ADVENTURE", "An unusual and exciting experience or activity"),
-         ("EXPLORATION", "The action of traveling in or through an unfamiliar area in order to learn about it"),
-         ("DISCOVERY", "The act of finding or learning something for the first time"),
-         ("JOURNEY", "An act of traveling from one place to another"),
-         ("EXPEDITION", "A journey undertaken by a group of people with a particular purpose")],
-        [("LITERATURE", "Written works, especially those considered of superior or lasting artistic merit"),
-         ("POETRY", "Literary work in which special intensity is given to the expression of feelings and ideas by the use of distinctive style and rhythm"),
-         ("FICTION", "Literature in the form of prose, especially novels, that describes imaginary events and people"),
-         ("NONFICTION", "Prose writing that is based on facts, real events, and real people, such as biography or history"),
-         ("DRAMA", "A play for theater, radio, or television")]]
-
     # Randomly choose one word list
-    selected_word_list = random.choice(word_lists)
+    if puzzle is None:
+        selected_word_list = random.choice(load_word_lists())
+    else:
+        selected_word_list = [tuple(pair) for pair in puzzle['words']]
     
     trie = Trie()
     for word, definition in selected_word_list:
@@ -460,11 +288,30 @@ def main():
         else:
             print(f"Word '{word}' not found in trie.")
 
-    grid_size = handle_user_input()
-    word_search_csp = WordSearchCSP(grid_size, trie)
-    print(word_search_csp.display_grid())
-    word_search_csp.solve()
-    word_search_csp.word_search_graph.fill_empty_spaces()
+    if puzzle is None:
+        # Ask again for a size the words actually fit in rather than filling a
+        # half-placed grid
+        while True:
+            grid_size = handle_user_input()
+            word_search_csp = WordSearchCSP(grid_size, trie)
+            solved = word_search_csp.solve(heuristic=True, max_backtracks=MAX_BACKTRACKS)
+            stats = word_search_csp.word_search_graph.stats
+            print(f"Placement {stats.status} in {1000 * stats.seconds:.1f} ms: {stats.nodes} nodes, "
+                  f"{stats.checks} checks, {stats.assignments} assignments, {stats.backtracks} backtracks, "
+                  f"max depth {stats.max_depth}")
+            if solved:
+                break
+            print(f"Could not place the words on a {grid_size}x{grid_size} grid, try another size")
+        word_search_csp.display_grid()
+        word_search_csp.word_search_graph.fill_empty_spaces()
+        grid = word_search_csp.word_search_graph.grid
+    else:
+        grid = [list(row) for row in puzzle['grid']]
+    # Shaped boards may not be square; cells outside the shape are BLOCKED
+    rows, cols = len(grid), len(grid[0])
+    block_size = 400 // max(rows, cols)
+    # Drag and mouse-up resolve selections through this instead of rebuilding them
+    lines = LineIndex(grid)
     
     
     start_pos = None
@@ -478,12 +325,20 @@ def main():
     # Calculate the total number of characters of the words to be found
     total_characters = sum(len(word) for word, _ in selected_word_list)
 
+    clock = pygame.time.Clock()
+    renderer = BoardRenderer(SCREEN, rows, cols, block_size,
+                             lambda i, j, rect: draw_cell(grid, i, j, rect, selected_cells, found_word_cells),
+                             LIGHT_GRAY, active=lambda i, j: grid[i][j] != BLOCKED)
+    # Found-word highlights and the end screen run on the timeline, never on delays
+    timeline = Timeline()
+
     while True:
-        SCREEN.fill(LIGHT_GRAY)
+        timeline.update()
         time_left = int(time_limit - (time.time() - start_time))
         if time_left <= 0:
             print("Time's up!")
             display_gameover_win(score, start_time, total_characters)
+            wait_on_end_screen(timeline, clock, fps)
             break
 
         for event in pygame.event.get():
@@ -492,32 +347,45 @@ def main():
                 sys.exit()
             elif event.type == pygame.MOUSEBUTTONDOWN:
                 if event.button == 1:  # Left mouse button
-                    start_pos = (event.pos[1] // (400 // grid_size), event.pos[0] // (400 // grid_size))
+                    start_pos = (event.pos[1] // block_size, event.pos[0] // block_size)
+                    renderer.invalidate(selected_cells | {start_pos})
                     selected_cells = {start_pos}
             elif event.type == pygame.MOUSEMOTION:
-                if start_pos:
-                    end_pos = (event.pos[1] // (400 // grid_size), event.pos[0] // (400 // grid_size))
-                    selected_cells = get_cells_between(start_pos, end_pos)
+                cell = (event.pos[1] // block_size, event.pos[0] // block_size)
+                # Most motion events stay inside the same cell; only a new end cell
+                # changes the selection
+                if start_pos and cell != end_pos:
+                    end_pos = cell
+                    cells = set(lines.cells(start_pos, end_pos))
+                    renderer.invalidate(selected_cells ^ cells)
+                    selected_cells = cells
             elif event.type == pygame.MOUSEBUTTONUP:
                 if event.button == 1 and start_pos:
-                    end_pos = (event.pos[1] // (400 // grid_size), event.pos[0] // (400 // grid_size))
-                    selected_word = find_selected_word(word_search_csp.word_search_graph.grid, start_pos, end_pos)
+                    end_pos = (event.pos[1] // block_size, event.pos[0] // block_size)
+                    selected_word = lines.word(start_pos, end_pos)
                     found, _ = trie.search(selected_word)
                     if found:
-                        found_word_cells.update(selected_cells)
+                        highlight_found_word(timeline, renderer, found_word_cells, start_pos, selected_cells)
                         score += len(selected_word)
                         send_word_to_flask(selected_word, _)  # Send the found word and definition to Flask
 
                     start_pos = None
                     end_pos = None
+                    renderer.invalidate(selected_cells)
                     selected_cells = set()
 
-        draw_grid(word_search_csp.word_search_graph.grid, selected_cells, found_word_cells, score, time_left)
-        display_selected_words(selected_word_list)  # Display selected words
-        pygame.display.flip()
+        # Only cells whose selection/found state changed and HUD values that
+        # changed are redrawn and pushed to the display
+        renderer.draw_cells()
+        renderer.region('score', score, lambda: display_score(score))
+        renderer.region('time', time_left, lambda: display_time_left(time_left))
+        renderer.region('words', None, lambda: display_selected_words(selected_word_list))  # Display selected words
+        renderer.present()
+        clock.tick(fps)
 
         if len(found_word_cells) == total_characters:
             display_gameover_win(score, start_time, total_characters)  # Display the game-over/win screen
+            wait_on_end_screen(timeline, clock, fps)
             break  # Exit the game loop if all words have been found
 
 
@@ -609,45 +477,5 @@ def search_word_in_trie(root, word):
     return path
 
 
-def get_cells_between(start_pos, end_pos):
-    cells = set()
-    if start_pos and end_pos:
-        start_row, start_col = start_pos
-        end_row, end_col = end_pos
-
-        if start_row == end_row:
-            # Horizontal selection
-            if start_col < end_col:
-                for col in range(start_col, end_col + 1):
-                    cells.add((start_row, col))
-            else:
-                for col in range(end_col, start_col + 1):
-                    cells.add((start_row, col))
-        elif start_col == end_col:
-            # Vertical selection
-            if start_row < end_row:
-                for row in range(start_row, end_row + 1):
-                    cells.add((row, start_col))
-            else:
-                for row in range(end_row, start_row + 1):
-                    cells.add((row, start_col))
-        elif abs(start_row - end_row) == abs(start_col - end_col):
-            # Diagonal selection
-            if start_row < end_row:
-                if start_col < end_col:
-                    for i in range(end_row - start_row + 1):
-                        cells.add((start_row + i, start_col + i))
-                else:
-                    for i in range(end_row - start_row + 1):
-                        cells.add((start_row + i, start_col - i))
-            else:
-                if start_col < end_col:
-                    for i in range(start_row - end_row + 1):
-                        cells.add((start_row - i, start_col + i))
-                else:
-                    for i in range(start_row - end_row + 1):
-                        cells.add((start_row - i, start_col - i))
-    return cells
-
 if __name__ == "__main__":
     main()
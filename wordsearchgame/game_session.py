@@ -0,0 +1,104 @@
+import time
+import uuid
+
+from compact_trie import CompactTrie
+from grid_solver import word_index
+from puzzle import LineIndex
+from shapes import BLOCKED
+
+TIME_LIMIT = 130  # seconds, same as the pygame game
+
+
+class GameSession:
+    # One player's game without any window: the board comes from
+    # puzzle.generate_puzzle() (or the puzzle pool) and selections are (start, end)
+    # cells resolved the same way the pygame loop resolves a mouse drag.
+    # trie may be a CompactTrie of the words shared between sessions, or a bigger
+    # one holding them, like the mapped dictionary's: it is only used to find the
+    # words on the board, and the game's own words and definitions decide what
+    # counts. The answer key comes from the puzzle's placements, so a word that
+    # also shows up inside a longer one (FICTION in NONFICTION) points at where
+    # it was placed; the board is only scanned for words without one. The answer
+    # key and line index are only built when a request needs them, so a session
+    # restored from the session store costs nothing until it is played.
+    def __init__(self, puzzle, time_limit=TIME_LIMIT, game_id=None, trie=None):
+        self.game_id = game_id or uuid.uuid4().hex
+        self.seed = puzzle.get('seed')
+        self.grid = puzzle['grid']
+        self.grid_size = puzzle['grid_size']
+        # A shaped board may not be grid_size square; its rows say how big it is
+        self.rows = len(self.grid)
+        self.cols = len(self.grid[0])
+        self.words = [tuple(pair) for pair in puzzle['words']]
+        self.definitions = dict(self.words)
+        self.placements = puzzle.get('placements')
+        self.trie = trie or CompactTrie(self.words)
+        self.found_words = set()
+        self.score = 0
+        self.deadline = int(time.time()) + time_limit
+        self._answer_key = None
+        self._lines = None
+
+    @property
+    def answer_key(self):
+        if self._answer_key is None:
+            placements = self.placements or {}
+            answer_key = {word: [tuple(cell) for cell in placements[word]]
+                          for word in self.definitions if placements.get(word)}
+            if len(answer_key) < len(self.definitions):
+                for word, cells in word_index(self.grid, self.trie).items():
+                    if word in self.definitions:
+                        answer_key.setdefault(word, cells)
+            self._answer_key = answer_key
+        return self._answer_key
+
+    @property
+    def lines(self):
+        if self._lines is None:
+            self._lines = LineIndex(self.grid)
+        return self._lines
+
+    @property
+    def found_word_cells(self):
+        return {cell for word in self.found_words for cell in self.answer_key.get(word, ())}
+
+    def time_left(self):
+        return max(0, self.deadline - int(time.time()))
+
+    def is_over(self):
+        return self.time_left() == 0 or len(self.found_words) == len(self.words)
+
+    def select(self, start_pos, end_pos):
+        for row, col in (start_pos, end_pos):
+            if not (0 <= row < self.rows and 0 <= col < self.cols) or self.grid[row][col] == BLOCKED:
+                raise ValueError(f"cell ({row}, {col}) is outside the board")
+        result = {'word': None, 'found': False}
+        if not self.is_over():
+            selected_word = self.lines.word(start_pos, end_pos)
+            if selected_word in self.definitions and selected_word not in self.found_words:
+                self.found_words.add(selected_word)
+                self.score += len(selected_word)
+                result = {'word': selected_word, 'found': True, 'definition': self.definitions[selected_word]}
+        result.update(score=self.score, time_left=self.time_left(), game_over=self.is_over())
+        return result
+
+    def hint(self):
+        # First cell of a word that hasn't been found yet
+        for word, _ in self.words:
+            if word not in self.found_words and word in self.answer_key:
+                return {'length': len(word), 'start': self.answer_key[word][0]}
+        return None
+
+    def state(self):
+        return {
+            'game_id': self.game_id,
+            'seed': self.seed,
+            'grid': self.grid,
+            'clues': [{'definition': definition, 'length': len(word), 'found': word in self.found_words}
+                      for word, definition in self.words],
+            'found_words': sorted(self.found_words),
+            'found_cells': sorted(self.found_word_cells),
+            'score': self.score,
+            'time_left': self.time_left(),
+            'game_over': self.is_over(),
+        }
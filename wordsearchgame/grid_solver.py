@@ -0,0 +1,44 @@
+from placement import DIRECTIONS
+
+
+def find_words(grid, trie):
+    # Walks the trie outwards from every cell in all eight directions, in one pass
+    # over the board, and yields (word, cells) for every occurrence of a trie word.
+    # A walk stops as soon as the letters read so far are not a prefix in the trie,
+    # so most walks end after one or two cells. Letters are compared upper case so
+    # cells lower-cased by highlight_word still match.
+    letters = [''.join(row).upper() for row in grid]
+    rows = len(letters)
+    cols = len(letters[0]) if rows else 0
+    root = trie.root
+    for i in range(rows):
+        for j in range(cols):
+            first = root.children.get(letters[i][j])
+            if first is None:
+                continue
+            if first.is_end_of_word:
+                yield letters[i][j], [(i, j)]
+            for di, dj in DIRECTIONS:
+                node = first
+                path = [(i, j)]
+                x, y = i, j
+                while True:
+                    x += di
+                    y += dj
+                    if not (0 <= x < rows and 0 <= y < cols):
+                        break
+                    node = node.children.get(letters[x][y])
+                    if node is None:
+                        break
+                    path.append((x, y))
+                    if node.is_end_of_word:
+                        yield ''.join(letters[r][c] for r, c in path), list(path)
+
+
+def word_index(grid, trie):
+    # word -> cells of its first occurrence on the board. Shared by highlighting,
+    # hints and answer-key export so the board is only scanned once.
+    index = {}
+    for word, cells in find_words(grid, trie):
+        index.setdefault(word, cells)
+    return index
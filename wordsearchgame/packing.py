@@ -0,0 +1,186 @@
+import random
+import time
+
+from placement import DIRECTIONS, EMPTY, SolverStats
+from shapes import BLOCKED
+
+# Words of one length that may fail in a row before the rest of that length is
+# skipped; on a filling board long words stop fitting long before short ones do
+PATIENCE = 50
+
+
+class WordPacker:
+    # Packs as many of a large pool of words onto a PlacementGrid as it can in
+    # time_budget seconds, for dense boards instead of a handful of words in a sea
+    # of filler. Greedy, longest words first: each word goes where it crosses the
+    # most letters already on the board, found through an index of where every
+    # letter sits, so only slots through a matching letter are ever checked.
+    # Words that cross nothing go into a wholly empty slot while one of their
+    # length is left. After PATIENCE failures in a row the packer moves on to
+    # shorter words. A word that contains a placed word, or is contained in
+    # one, is skipped, and a placement that spells any placed word a second
+    # time across the letters around it is taken back, so no word shows up
+    # twice.
+    def __init__(self, board, words, rng=None, time_budget=0.5, min_length=3, stats=None):
+        self.board = board
+        self.rng = rng or random
+        self.time_budget = time_budget
+        longest = max(board.rows, board.cols)
+        self.words = sorted({word for word in words if min_length <= len(word) <= longest})
+        self.stats = stats or SolverStats()
+        self.overlaps = 0
+        # Every row, column and diagonal as flat cell indices, and the lines
+        # through each cell
+        rows, cols = board.rows, board.cols
+        self.lines = []
+        self.lines_through = [[] for _ in range(rows * cols)]
+        for dr, dc in ((0, 1), (1, 0), (1, 1), (1, -1)):
+            for row in range(rows):
+                for col in range(cols):
+                    if 0 <= row - dr < rows and 0 <= col - dc < cols:
+                        continue  # not the first cell of its line
+                    line = []
+                    i, j = row, col
+                    while 0 <= i < rows and 0 <= j < cols:
+                        line.append(i * cols + j)
+                        self.lines_through[i * cols + j].append(len(self.lines))
+                        i, j = i + dr, j + dc
+                    self.lines.append(line)
+
+    def _anchored(self, word, cells_by_letter):
+        # Slots for word through at least one matching letter, with the number of
+        # letters they share
+        board = self.board
+        rows, cols = board.rows, board.cols
+        length = len(word)
+        seen = set()
+        found = []
+        for k, letter in enumerate(word):
+            for cell in cells_by_letter.get(letter, ()):
+                row, col = divmod(cell, cols)
+                for dr, dc in DIRECTIONS:
+                    start_row, start_col = row - k * dr, col - k * dc
+                    end_row, end_col = start_row + (length - 1) * dr, start_col + (length - 1) * dc
+                    if not (0 <= start_row < rows and 0 <= start_col < cols
+                            and 0 <= end_row < rows and 0 <= end_col < cols):
+                        continue
+                    step = dr * cols + dc
+                    start = start_row * cols + start_col
+                    if (start, step) in seen:
+                        continue
+                    seen.add((start, step))
+                    stop = start + step * length
+                    slot = slice(start, stop if stop >= 0 else None, step)
+                    if board.fits(word, slot):
+                        shared = length - board.cells[slot].count(EMPTY)
+                        if shared < length:
+                            found.append((shared, slot))
+        return found
+
+    def _text(self, line_ids):
+        cells = self.board.cells
+        return '|'.join(bytes(cells[i] for i in self.lines[line]).decode('latin-1') for line in line_ids)
+
+    def _occurrences(self, word, text):
+        # Times word can be read in text either way, overlapping ones included
+        count = 0
+        for spelling in {word, word[::-1]}:
+            i = text.find(spelling)
+            while i >= 0:
+                count += 1
+                i = text.find(spelling, i + 1)
+        return count
+
+    def _spells_twice(self, word, slot, placed_text):
+        # Places word and reports whether that spelled any placed word, or word
+        # itself, somewhere it wasn't placed; only the lines through the slot
+        # change, so only those are compared before and after.
+        board = self.board
+        cells = [slot.start + slot.step * i for i in range(len(word))]
+        touched = sorted({line for cell in cells for line in self.lines_through[cell]})
+        before = self._text(touched)
+        board.place(word.encode('ascii'), slot)
+        after = self._text(touched)
+        if self._occurrences(word, after) != 1:
+            return True
+        if any(self._occurrences(text, after) != self._occurrences(text, before) for text in placed_text):
+            return True
+        untouched = set(range(len(self.lines))) - set(touched)
+        return self._occurrences(word, self._text(untouched)) > 0
+
+    def _empty_slot(self, word):
+        board = self.board
+        for slot in board.candidates(word, self.rng):
+            if not any(board.cells[slot]):
+                return slot
+        return None
+
+    def pack(self):
+        # Returns [(word, cells), ...] for the words placed, in placement order
+        board = self.board
+        rng = self.rng
+        stats = self.stats
+        start = time.perf_counter()
+        deadline = start + self.time_budget
+        checks = board.checks
+        words = list(self.words)
+        rng.shuffle(words)
+        words.sort(key=len, reverse=True)
+        cells_by_letter = {}
+        for cell, letter in enumerate(board.cells):
+            if letter != EMPTY:
+                cells_by_letter.setdefault(letter, []).append(cell)
+        placed = []
+        placed_text = []
+        # Once no wholly empty slot of some length is left there never will be
+        no_empty_slot = len(max(words, key=len)) + 1 if words else 0
+        length = failures = 0
+        for word in words:
+            if time.perf_counter() > deadline:
+                stats.status = 'budget_exhausted'
+                break
+            if len(word) != length:
+                length, failures = len(word), 0
+            if failures >= PATIENCE:
+                continue
+            backwards = word[::-1]
+            if any(text in word or text in backwards or word in text or backwards in text for text in placed_text):
+                continue
+            stats.nodes += 1
+            encoded = word.encode('ascii')
+            options = self._anchored(encoded, cells_by_letter)
+            if options:
+                best = max(shared for shared, _ in options)
+                shared, slot = rng.choice([option for option in options if option[0] == best])
+            elif len(word) < no_empty_slot:
+                shared, slot = 0, self._empty_slot(encoded)
+                if slot is None:
+                    no_empty_slot = len(word)
+                    failures += 1
+                    continue
+            else:
+                failures += 1
+                continue
+            if self._spells_twice(word, slot, placed_text):
+                board.undo()
+                failures += 1
+                continue
+            failures = 0
+            for cell in board.trail[-1]:
+                cells_by_letter.setdefault(board.cells[cell], []).append(cell)
+            stats.assignments += 1
+            self.overlaps += shared
+            placed.append((word, board.table.cells(slot, len(word))))
+            placed_text.append(word)
+        else:
+            stats.status = 'solved'
+        stats.max_depth = max(stats.max_depth, len(placed))
+        stats.checks += board.checks - checks
+        stats.seconds += time.perf_counter() - start
+        return placed
+
+    def density(self):
+        # Share of the board's cells (inside its shape) covered by words
+        cells = self.board.cells
+        active = len(cells) - cells.count(ord(BLOCKED))
+        return 1 - cells.count(EMPTY) / active if active else 0.0
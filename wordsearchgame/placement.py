@@ -0,0 +1,445 @@
+import random
+import threading
+import time
+from collections import OrderedDict
+from math import gcd
+
+from shapes import BLOCKED, Mask
+from solver_metrics import profiling
+
+
+# (row step, column step) for every line a word can be placed along: both ways
+# horizontally, vertically and along both diagonals
+DIRECTIONS = [(0, 1), (0, -1), (1, 0), (-1, 0), (1, 1), (-1, -1), (1, -1), (-1, 1)]
+
+EMPTY = 0
+
+# Maps every non-empty byte to 0xFF so a slot's contents can be turned into a mask
+_OCCUPIED = bytes([0x00] + [0xFF] * 255)
+
+# Slot tables for the most recently used board sizes and shapes
+_slot_tables = OrderedDict()
+_slot_tables_lock = threading.Lock()
+SLOT_TABLE_CACHE_SIZE = 64
+
+
+class SlotTable:
+    # Every in-bounds line of a given length on a rows x cols board. A slot is stored
+    # as a slice over the flat row-major grid, so reading or writing a whole word is
+    # a single bytearray slice operation. With a shapes.Mask, lines through blocked
+    # cells are left out up front, so a shaped board searches only real slots.
+    def __init__(self, rows, cols, directions=DIRECTIONS, mask=None):
+        self.rows = rows
+        self.cols = cols
+        self.directions = directions
+        self.mask = mask
+        self._by_length = {}
+        self._directions = {}
+        self._covering = {}
+
+    def slots(self, length):
+        if length not in self._by_length:
+            self._by_length[length] = self._build(length)
+        return self._by_length[length]
+
+    def slot_directions(self, length):
+        # The (row step, column step) of every slot in slots(length), by index
+        self.slots(length)
+        return self._directions[length]
+
+    def _build(self, length):
+        slots = []
+        directions = self._directions[length] = []
+        for dr, dc in self.directions:
+            step = dr * self.cols + dc
+            for row in range(self.rows):
+                end_row = row + dr * (length - 1)
+                if not 0 <= end_row < self.rows:
+                    continue
+                for col in range(self.cols):
+                    end_col = col + dc * (length - 1)
+                    if not 0 <= end_col < self.cols:
+                        continue
+                    start = row * self.cols + col
+                    stop = start + step * length
+                    if self.mask is not None and not all(self.mask.cells[start:stop if stop >= 0 else None:step]):
+                        continue
+                    slots.append(slice(start, stop if stop >= 0 else None, step))
+                    directions.append((dr, dc))
+        return slots
+
+    def covering(self, length):
+        # For every flat cell index and position i in a word, the slot indices
+        # (into slots(length)) whose i-th cell it is: covering[cell][i]
+        if length not in self._covering:
+            covering = [[[] for _ in range(length)] for _ in range(self.rows * self.cols)]
+            for index, slot in enumerate(self.slots(length)):
+                for i in range(length):
+                    covering[slot.start + slot.step * i][i].append(index)
+            self._covering[length] = covering
+        return self._covering[length]
+
+    def cells(self, slot, length):
+        return [divmod(slot.start + slot.step * i, self.cols) for i in range(length)]
+
+
+def slot_table(rows, cols, mask=None):
+    # Shared per board size and shape
+    if mask is not None and mask.is_full():
+        mask = None
+    key = (rows, cols, mask)
+    with _slot_tables_lock:
+        table = _slot_tables.get(key)
+        if table is not None:
+            _slot_tables.move_to_end(key)
+            return table
+    table = SlotTable(rows, cols, mask=mask)
+    with _slot_tables_lock:
+        _slot_tables[key] = table
+        if len(_slot_tables) > SLOT_TABLE_CACHE_SIZE:
+            _slot_tables.popitem(last=False)
+    return table
+
+
+class PlacementGrid:
+    # Blocked cells of a mask hold BLOCKED, which no letter matches, so nothing
+    # is ever placed across them even outside the slot table.
+    def __init__(self, rows, cols, mask=None):
+        self.rows = rows
+        self.cols = cols
+        self.cells = bytearray(rows * cols)
+        if mask is not None:
+            for cell, active in enumerate(mask.cells):
+                if not active:
+                    self.cells[cell] = ord(BLOCKED)
+        self.table = slot_table(rows, cols, mask)
+        self.trail = []
+        self.checks = 0  # fits() calls, for SolverStats
+
+    @classmethod
+    def from_rows(cls, grid):
+        # BLOCKED cells in grid give the board their shape
+        mask = Mask.from_grid(grid) if any(BLOCKED in row for row in grid) else None
+        board = cls(len(grid), len(grid[0]), mask)
+        for i, row in enumerate(grid):
+            for j, letter in enumerate(row):
+                if letter != ' ':
+                    board.cells[i * board.cols + j] = ord(letter)
+        return board
+
+    def to_rows(self):
+        text = self.cells.replace(b'\x00', b' ').decode('ascii')
+        return [list(text[i * self.cols:(i + 1) * self.cols]) for i in range(self.rows)]
+
+    def fits(self, word, slot):
+        # A slot fits when every occupied cell already holds the word's letter there.
+        # Comparing the slot as one big integer against the word masked to the
+        # occupied cells checks all letters at once.
+        self.checks += 1
+        current = self.cells[slot]
+        if not any(current):
+            return True
+        mask = int.from_bytes(current.translate(_OCCUPIED), 'big')
+        return int.from_bytes(current, 'big') == int.from_bytes(word, 'big') & mask
+
+    def place(self, word, slot):
+        # Writes word into slot and pushes the cells that were empty before onto the
+        # trail, so undo() clears exactly those and keeps letters shared with
+        # earlier words.
+        previous = self.cells[slot]
+        self.cells[slot] = word
+        written = [slot.start + slot.step * i for i, letter in enumerate(previous) if letter == EMPTY]
+        self.trail.append(written)
+        return written
+
+    def undo(self):
+        cells = self.cells
+        for cell in self.trail.pop():
+            cells[cell] = EMPTY
+
+    def candidates(self, word, rng=random):
+        slots = self.table.slots(len(word))
+        for index in affine_order(len(slots), rng):
+            slot = slots[index]
+            if self.fits(word, slot):
+                yield slot
+
+
+def affine_order(n, rng=random):
+    # Visit range(n) in a random affine order (offset + k * stride mod n) so every
+    # index comes up once without shuffling a list the size of the slot table.
+    if n == 0:
+        return
+    offset = rng.randrange(n)
+    stride = rng.randrange(1, n) if n > 1 else 1
+    while gcd(stride, n) != 1:
+        stride = rng.randrange(1, n)
+    for k in range(n):
+        yield (offset + k * stride) % n
+
+
+class BudgetExhausted(Exception):
+    pass
+
+
+def luby(i):
+    # i-th term (from 1) of the Luby sequence 1, 1, 2, 1, 1, 2, 4, 1, 1, 2, ...
+    # Scaled by a unit it is the restart schedule that is within a log factor of
+    # the best fixed cutoff without knowing the run-time distribution.
+    while True:
+        k = i.bit_length()
+        if i == (1 << k) - 1:
+            return 1 << (k - 1)
+        i -= (1 << (k - 1)) - 1
+
+
+class SolverStats:
+    # What one solve() did: search nodes entered, fits() checks, words written to
+    # the board, placements undone, the most words on the board at once, and wall
+    # time, in total and per word. A word's time covers choosing and writing its
+    # slots, not the search below it, so slow words stand out. Solves sharing one
+    # SolverStats (the runs of a restarting search) add up; status is the last one's.
+    def __init__(self):
+        self.status = None
+        self.restarts = 0
+        self.nodes = 0
+        self.checks = 0
+        self.assignments = 0
+        self.backtracks = 0
+        self.max_depth = 0
+        self.seconds = 0.0
+        self.word_seconds = {}
+
+    def as_dict(self):
+        return {
+            'status': self.status,
+            'restarts': self.restarts,
+            'nodes': self.nodes,
+            'checks': self.checks,
+            'assignments': self.assignments,
+            'backtracks': self.backtracks,
+            'max_depth': self.max_depth,
+            'seconds': self.seconds,
+            'word_seconds': dict(self.word_seconds),
+        }
+
+
+class PlacementSolver:
+    # Places words (str) onto a PlacementGrid. The default mode tries words in the
+    # order given; heuristic mode always branches on the unplaced word with the
+    # fewest fitting slots (longest first on ties) and forward-checks: after each
+    # placement the candidate slots of every other word are narrowed, and the
+    # branch is abandoned as soon as one of them has none left. Candidates are
+    # kept as the slots ruled out, which only ever lie across letters already on
+    # the board, so on a sparse board the bookkeeping is a few small sets rather
+    # than a copy of the slot table per word. Heuristic mode still starts with an
+    # in-order pass allowed one backtrack per word: on a sparse board that places
+    # everything in well under a millisecond, and only boards where it gets
+    # stuck pay for forward checking.
+    #
+    # max_backtracks and deadline (a time.perf_counter() value) both end the
+    # search with BudgetExhausted; a backtrack can cost anything from one fits()
+    # to a scan of the slot table, so only the deadline bounds wall time.
+    #
+    # status is 'solved', 'unsatisfiable', 'budget_exhausted' or, when the deadline
+    # ended it, 'timed_out' after solve(), and
+    # stats (a SolverStats, which may be passed in to collect them) holds the
+    # counters and timings of the search.
+    def __init__(self, board, words, rng=None, heuristic=False, max_backtracks=None, stats=None, deadline=None):
+        self.board = board
+        self.words = list(words)
+        self.rng = rng or random
+        self.heuristic = heuristic
+        self.max_backtracks = max_backtracks
+        self.deadline = deadline
+        self.backtracks = 0
+        self.status = None
+        self.stats = stats or SolverStats()
+
+    def solve(self):
+        encoded = [word.encode('ascii') for word in self.words]
+        self.backtracks = 0
+        self._word_seconds = [0.0] * len(encoded)
+        checks = self.board.checks
+        start = time.perf_counter()
+        with profiling():
+            try:
+                slots = self._search(encoded)
+            except BudgetExhausted:
+                slots = None
+                if self.deadline is not None and time.perf_counter() > self.deadline:
+                    self.status = 'timed_out'
+                else:
+                    self.status = 'budget_exhausted'
+            else:
+                self.status = 'unsatisfiable' if slots is None else 'solved'
+        stats = self.stats
+        stats.status = self.status
+        stats.seconds += time.perf_counter() - start
+        stats.checks += self.board.checks - checks
+        stats.backtracks += self.backtracks
+        for word, seconds in zip(self.words, self._word_seconds):
+            stats.word_seconds[word] = stats.word_seconds.get(word, 0.0) + seconds
+        if slots is None:
+            return None
+        table = self.board.table
+        return [(word, table.cells(slots[i], len(word))) for i, word in enumerate(self.words)]
+
+    def _search(self, encoded):
+        # The slot of every word, in order, or None; subclasses search differently
+        if self.heuristic:
+            return self._probe(encoded) or self._solve_heuristic(encoded)
+        return self._solve_in_order(encoded)
+
+    def _probe(self, encoded):
+        # In-order search cut off after len(encoded) more backtracks, with the
+        # board put back as it was when it gives up
+        board = self.board
+        depth = len(board.trail)
+        budget = self.max_backtracks
+        self.max_backtracks = self.backtracks + len(encoded)
+        if budget is not None:
+            self.max_backtracks = min(self.max_backtracks, budget)
+        try:
+            return self._solve_in_order(encoded)
+        except BudgetExhausted:
+            if budget is not None and self.backtracks > budget:
+                raise
+            if self.deadline is not None and time.perf_counter() > self.deadline:
+                raise
+            while len(board.trail) > depth:
+                board.undo()
+            return None
+        finally:
+            self.max_backtracks = budget
+
+    def _entered(self, depth):
+        stats = self.stats
+        stats.nodes += 1
+        if depth > stats.max_depth:
+            stats.max_depth = depth
+
+    def _backtracked(self):
+        self.backtracks += 1
+        if self.max_backtracks is not None and self.backtracks > self.max_backtracks:
+            raise BudgetExhausted()
+        if self.deadline is not None and time.perf_counter() > self.deadline:
+            raise BudgetExhausted()
+
+    def _solve_in_order(self, encoded):
+        board = self.board
+        placed = []
+
+        stats = self.stats
+        word_seconds = self._word_seconds
+
+        def backtrack(index):
+            self._entered(index)
+            if index == len(encoded):
+                return True
+            word = encoded[index]
+            started = time.perf_counter()
+            for slot in board.candidates(word, self.rng):
+                board.place(word, slot)
+                stats.assignments += 1
+                placed.append(slot)
+                word_seconds[index] += time.perf_counter() - started
+                if backtrack(index + 1):
+                    return True
+                started = time.perf_counter()
+                placed.pop()
+                board.undo()
+                self._backtracked()
+            word_seconds[index] += time.perf_counter() - started
+            return False
+
+        return placed if backtrack(0) else None
+
+    def _solve_heuristic(self, encoded):
+        board = self.board
+        table = board.table
+        slots_by_length = {len(word): table.slots(len(word)) for word in encoded}
+        cells = board.cells
+        occupied = [cell for cell, letter in enumerate(cells) if letter != EMPTY]
+
+        def clashing(word, written):
+            # Slots of word that put a different letter on one of the written cells
+            covering = table.covering(len(word))
+            found = set()
+            for cell in written:
+                letter = cells[cell]
+                at = covering[cell]
+                for i, wanted in enumerate(word):
+                    if wanted != letter:
+                        found.update(at[i])
+            return found
+
+        # ruled_out[i]: indices into word i's slots that don't fit; the others do
+        ruled_out = [clashing(word, occupied) for word in encoded]
+        unplaced = set(range(len(encoded)))
+        chosen = {}
+
+        def left(index):
+            return len(slots_by_length[len(encoded[index])]) - len(ruled_out[index])
+
+        def narrow(written):
+            # Rule out candidate slots that no longer fit now that `written` cells
+            # hold letters. Returns the removals so they can be undone, or None
+            # with everything already undone if some word has no slot left.
+            removals = []
+            for other in unplaced:
+                stale = clashing(encoded[other], written)
+                stale -= ruled_out[other]
+                if stale:
+                    ruled_out[other] |= stale
+                    removals.append((other, stale))
+                    if not left(other):
+                        undo(removals)
+                        return None
+            return removals
+
+        def undo(removals):
+            for other, stale in removals:
+                ruled_out[other] -= stale
+
+        stats = self.stats
+        word_seconds = self._word_seconds
+
+        def backtrack():
+            self._entered(len(encoded) - len(unplaced))
+            if not unplaced:
+                return True
+            started = time.perf_counter()
+            index = min(unplaced, key=lambda i: (left(i), -len(encoded[i])))
+            word = encoded[index]
+            slots = slots_by_length[len(word)]
+            unplaced.remove(index)
+            excluded = ruled_out[index]
+            for slot_index in affine_order(len(slots), self.rng):
+                if slot_index in excluded:
+                    continue
+                slot = slots[slot_index]
+                removals = narrow(board.place(word, slot))
+                stats.assignments += 1
+                if removals is not None:
+                    chosen[index] = slot
+                    word_seconds[index] += time.perf_counter() - started
+                    if backtrack():
+                        return True
+                    started = time.perf_counter()
+                    undo(removals)
+                board.undo()
+                self._backtracked()
+            unplaced.add(index)
+            word_seconds[index] += time.perf_counter() - started
+            return False
+
+        if not backtrack():
+            return None
+        return [chosen[i] for i in range(len(encoded))]
+
+
+def place_words(board, words, rng=None, heuristic=False, max_backtracks=None, stats=None):
+    # Returns a list of (word, cells) in the order given, or None when the words
+    # could not all be placed.
+    return PlacementSolver(board, words, rng, heuristic, max_backtracks, stats).solve()
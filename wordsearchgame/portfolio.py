@@ -0,0 +1,132 @@
+import multiprocessing
+import os
+import queue
+import random
+import threading
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from placement import SolverStats
+from puzzle import MAX_SOLVE_SECONDS, generate_puzzle
+from solver_metrics import METRICS
+
+SOLVERS = 4
+RESTART_UNIT = 64  # backtracks in the shortest Luby run
+MAX_BACKTRACKS = 20000  # per solver, over all its restarts
+
+# How many races can run at once on one executor; each race owns one stop flag
+STOP_SLOTS = 64
+
+# Set in each worker by init_worker
+_stop_flags = None
+
+
+def make_stop_flags():
+    return multiprocessing.RawArray('b', STOP_SLOTS)
+
+
+def init_worker(stop_flags):
+    # Initializer for any executor that races run on: the flags are shared memory,
+    # so setting one in the serving process is seen by every worker straight away
+    global _stop_flags
+    _stop_flags = stop_flags
+
+
+def _race_generate(word_list, grid_size, seed, slot, restart_unit, max_backtracks, difficulty, shape):
+    stats = SolverStats()
+    puzzle = generate_puzzle(word_list, grid_size, max_backtracks, seed, stats, restart_unit,
+                             stop=lambda: _stop_flags[slot], difficulty=difficulty, shape=shape,
+                             max_seconds=MAX_SOLVE_SECONDS)
+    return puzzle, stats
+
+
+class Portfolio:
+    # Races `solvers` differently seeded, Luby-restarting solves of the same board
+    # and keeps the first that finishes. A single seed's solve time is heavy
+    # tailed; the fastest of several is close to the median. Losers are cancelled
+    # if still queued, and the running ones stop at their next restart once the
+    # race's stop flag is set. The winner's seed is in the puzzle, and
+    # generate_puzzle() with that seed and restart_unit rebuilds the same board.
+    #
+    # executor's workers must have been started with init_worker(stop_flags);
+    # start() makes such an executor. Give races an executor of their own: on
+    # one shared with other work they queue behind it.
+    def __init__(self, executor, stop_flags, solvers=SOLVERS, restart_unit=RESTART_UNIT,
+                 max_backtracks=MAX_BACKTRACKS):
+        self.executor = executor
+        self.stop_flags = stop_flags
+        self.solvers = solvers
+        self.restart_unit = restart_unit
+        self.max_backtracks = max_backtracks
+        self._slots = queue.Queue()
+        for slot in range(len(stop_flags)):
+            self._slots.put(slot)
+        self._lock = threading.Lock()
+        self.races = 0
+        self.wins = {}  # index of the winning solver -> races it won
+        self.failures = 0
+
+    @classmethod
+    def start(cls, workers=None, **kwargs):
+        stop_flags = make_stop_flags()
+        executor = ProcessPoolExecutor(max_workers=workers or os.cpu_count(), initializer=init_worker,
+                                       initargs=(stop_flags,))
+        return cls(executor, stop_flags, **kwargs)
+
+    def race(self, word_list, grid_size, seed=None, difficulty=None, shape=None):
+        # The first board any solver finds, or None when none of them could place
+        # the words. seed picks the solvers' seeds, not which one wins.
+        rng = random.Random(seed)
+        seeds = [rng.randrange(2 ** 32) for _ in range(self.solvers)]
+        slot = self._slots.get()
+        self.stop_flags[slot] = 0
+        running = {self.executor.submit(_race_generate, word_list, grid_size, solver_seed, slot,
+                                        self.restart_unit, self.max_backtracks, difficulty, shape): index
+                   for index, solver_seed in enumerate(seeds)}
+        futures = list(running)
+        puzzle = None
+        winner = None
+        try:
+            while running and puzzle is None:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    index = running.pop(future)
+                    result, stats = future.result()
+                    METRICS.record(stats, grid_size, word_list)
+                    if result is not None and puzzle is None:
+                        puzzle, winner = result, index
+        finally:
+            self.stop_flags[slot] = 1
+            for future in running:
+                future.cancel()
+            self._release(slot, futures)
+        with self._lock:
+            self.races += 1
+            if puzzle is None:
+                self.failures += 1
+            else:
+                self.wins[winner] = self.wins.get(winner, 0) + 1
+        return puzzle
+
+    def _release(self, slot, futures):
+        # The slot is reused only once every solver of this race has returned, so
+        # a straggler can't miss its stop flag being cleared by the next race
+        remaining = [len(futures)]
+        lock = threading.Lock()
+
+        def finished(future):
+            with lock:
+                remaining[0] -= 1
+                if remaining[0]:
+                    return
+            self._slots.put(slot)
+
+        for future in futures:
+            future.add_done_callback(finished)
+
+    def stats(self):
+        with self._lock:
+            return {'solvers': self.solvers, 'restart_unit': self.restart_unit, 'races': self.races,
+                    'failures': self.failures, 'wins': dict(self.wins)}
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,488 @@
+import itertools
+import random
+import time
+from difficulty import TargetedSolver, get_target, plant_decoys
+from filler import fill_blanks
+from packing import WordPacker
+from placement import PlacementGrid, PlacementSolver, SolverStats, luby
+from shapes import make_mask
+
+# Times generate_puzzle() and pack_puzzle() place the words afresh when the
+# filler can't keep a duplicate or banned word off the board
+FILL_ATTEMPTS = 3
+
+# Wall-time cap on one generate_puzzle() solve, for callers that can retry with
+# another seed (the puzzle pool and the portfolio); seeded callers go uncapped
+MAX_SOLVE_SECONDS = 2.0
+
+# Themed (word, definition) lists the games pick from
+WORD_LISTS = [
+    [("ELEPHANT", "A very large plant-eating mammal with a trunk"),
+     ("MONKEY", "A small to medium-sized primate"),
+     ("GIRAFFE", "A tall African mammal with a long neck and legs"),
+     ("ZEBRA", "An African wild horse with black-and-white stripes"),
+     ("RHINOCEROS", "A large, heavily built herbivorous mammal with one or two upright horns on the snout")],
+    [("MOUNTAIN", "A large natural elevation of the earth's surface"),
+     ("VALLEY", "A low area of land between hills or mountains"),
+     ("FOREST", "A large area covered chiefly with trees and undergrowth"),
+     ("RIVER", "A large natural stream of water flowing in a channel"),
+     ("LAKE", "A large body of water surrounded by land")],
+    [("COMPUTER", "An electronic device for storing and processing data"),
+     ("INTERNET", "A global computer network providing a variety of information and communication facilities"),
+     ("SOFTWARE", "The programs and other operating information used by a computer"),
+     ("HARDWARE", "The physical components of a computer system"),
+     ("PROGRAMMING", "The process of writing computer programs")],
+    [("OCEAN", "A very large expanse of sea"),
+     ("SEA", "The expanse of salt water that covers most of the earth's surface"),
+     ("BEACH", "A pebbly or sandy shore, especially by the ocean"),
+     ("WAVE", "A long body of water curling into an arched form and breaking on the shore"),
+     ("TIDE", "The alternate rising and falling of the sea")],
+    [("ADVENTURE", "An unusual and exciting experience or activity"),
+     ("EXPLORATION", "The action of traveling in or through an unfamiliar area in order to learn about it"),
+     ("DISCOVERY", "The act of finding or learning something for the first time"),
+     ("JOURNEY", "An act of traveling from one place to another"),
+     ("EXPEDITION", "A journey undertaken by a group of people with a particular purpose")],
+    [("LITERATURE", "Written works, especially those considered of superior or lasting artistic merit"),
+     ("POETRY", "Literary work in which special intensity is given to the expression of feelings and ideas by the use of distinctive style and rhythm"),
+     ("FICTION", "Literature in the form of prose, especially novels, that describes imaginary events and people"),
+     ("NONFICTION", "Prose writing that is based on facts, real events, and real people, such as biography or history"),
+     ("DRAMA", "A play for theater, radio, or television")]]
+
+
+class TrieNode:
+    # Slots keep a node to its three fields, which matters for the tries of
+    # large imported word lists (word_import)
+    __slots__ = ('children', 'definition', 'is_end_of_word')
+
+    def __init__(self):
+        self.children = {}
+        self.definition = None
+        self.is_end_of_word = False
+        
+class Trie:
+    def __init__(self):
+        self.root = TrieNode()
+
+    def insert(self, word, definition=None, replace=True):
+        # Returns whether word is new; with replace=False a word already held
+        # keeps its definition
+        node = self.root
+        for char in word:
+            if char not in node.children:
+                node.children[char] = TrieNode()
+            node = node.children[char]
+        new = not node.is_end_of_word
+        if new or replace:
+            node.definition = definition
+        node.is_end_of_word = True
+        return new
+
+    def search(self, word):
+        current = self.root
+        for char in word:
+            if char not in current.children:
+                return False, None
+            current = current.children[char]
+        return current.is_end_of_word, current.definition
+
+    def get_all_words(self):
+        words = []
+        self._get_all_words_recursive(self.root, "", words)
+        return words
+
+    def _get_all_words_recursive(self, node, current_word, words):
+        if node.is_end_of_word:
+            words.append((current_word, node.definition))
+        for char, child_node in node.children.items():
+            self._get_all_words_recursive(child_node, current_word + char, words)
+    
+class WordSearchGraph:
+    # (row step, column step) for each named direction; orientation -1 reverses it
+    DIRECTION_STEPS = {'horizontal': (0, 1), 'vertical': (1, 0), 'diagonal': (1, 1), 'anti-diagonal': (1, -1)}
+
+    def __init__(self, grid, rng=None):
+        # rng is a random.Random; every random choice made while building the board
+        # comes from it, so a seeded rng always gives the same board
+        self.grid = grid
+        self.rng = rng or random
+        self.rows = len(grid)
+        self.cols = len(grid[0])
+        self.graph = {}
+        self.placements = {}
+        self.trail = []
+        self.status = None
+        self.stats = None
+        self.target = None
+        self.difficulty = None
+        self.density = None
+
+    def add_edge(self, node1, node2):
+        if node1 in self.graph:
+            self.graph[node1].append(node2)
+        else:
+            self.graph[node1] = [node2]
+
+    def build_graph(self):
+        for i in range(self.rows):
+            for j in range(self.cols):
+                current_node = (i, j)
+
+                for ni, nj in [(i + 1, j), (i - 1, j), (i, j + 1), (i, j - 1)]:
+                    if 0 <= ni < self.rows and 0 <= nj < self.cols:
+                        neighbor_node = (ni, nj)
+                        self.add_edge(current_node, neighbor_node)
+
+                for ni, nj in [(i + 1, j + 1), (i - 1, j - 1), (i - 1, j + 1), (i + 1, j - 1)]:
+                    if 0 <= ni < self.rows and 0 <= nj < self.cols:
+                        neighbor_node = (ni, nj)
+                        self.add_edge(current_node, neighbor_node)
+
+    def fill_empty_spaces(self):
+        # Filler letters are weighted like the placed words and never spell a
+        # placed word twice or a banned word (see filler.fill_blanks). A board
+        # built for a difficulty target gets decoys and letters as confusable
+        # as the target asks for. Returns what fill_blanks does: None when the
+        # board could not be kept clean and the words should be placed again.
+        if self.target is None:
+            return fill_blanks(self.grid, self.placements, self.rng, Trie())
+        confusability = self.target.confusability
+        plant_decoys(self.grid, self.placements, self.rng, round(confusability * len(self.placements)), Trie())
+        return fill_blanks(self.grid, self.placements, self.rng, Trie(), confusability=confusability)
+
+    def word_search_csp(self, words, index=0, heuristic=False, max_backtracks=None, stats=None,
+                        restart_unit=None, stop=None, target=None, max_seconds=None):
+        # With restart_unit, a run that backtracks more than restart_unit * luby(i)
+        # times (i counting runs) starts over on the empty board with the next
+        # random choices, until one solves, the words provably don't fit, or
+        # max_backtracks is used up over all runs. stop() is asked before every
+        # run; once it returns True the search gives up with status 'cancelled'.
+        # target, a difficulty.DifficultyTarget, builds the board to that target
+        # (see TargetedSolver) and leaves its score in self.difficulty.
+        # max_seconds bounds the whole search, restarts included, in wall time;
+        # running out of it leaves status 'timed_out'.
+        words = [word for word, _ in words[index:]]
+        self.stats = stats = stats or SolverStats()
+        deadline = time.perf_counter() + max_seconds if max_seconds is not None else None
+        for run in itertools.count(1):
+            if stop is not None and stop():
+                self.status = 'cancelled'
+                return False
+            budget = max_backtracks
+            if restart_unit is not None:
+                budget = restart_unit * luby(run)
+                if max_backtracks is not None:
+                    budget = min(budget, max(0, max_backtracks - stats.backtracks))
+            board = PlacementGrid.from_rows(self.grid)
+            if target is not None:
+                solver = TargetedSolver(board, words, target, rng=self.rng, max_backtracks=budget, stats=stats,
+                                        deadline=deadline)
+            else:
+                solver = PlacementSolver(board, words, rng=self.rng, heuristic=heuristic, max_backtracks=budget,
+                                         stats=stats, deadline=deadline)
+            placed = solver.solve()
+            self.status = solver.status
+            if self.status == 'budget_exhausted' and deadline is not None and time.perf_counter() > deadline:
+                self.status = stats.status = 'timed_out'
+            if (self.status != 'budget_exhausted' or restart_unit is None
+                    or max_backtracks is not None and stats.backtracks >= max_backtracks):
+                break
+            stats.restarts += 1
+        self.target = target
+        if placed is None:
+            return False
+        if target is not None:
+            self.difficulty = solver.score.as_dict()
+        for row, letters in zip(self.grid, board.to_rows()):
+            row[:] = letters
+        self.placements = dict(placed)
+        return True
+
+    def pack_words(self, words, time_budget=0.5, min_length=3, stats=None):
+        # Packs as many of words ([(word, definition), ...]) as fit in time_budget
+        # seconds onto the grid, crossing each other wherever they can (see
+        # packing.WordPacker). Returns the (word, definition) pairs placed.
+        board = PlacementGrid.from_rows(self.grid)
+        packer = WordPacker(board, [word for word, _ in words], self.rng, time_budget, min_length, stats)
+        placed = packer.pack()
+        self.stats = packer.stats
+        self.status = packer.stats.status
+        for row, letters in zip(self.grid, board.to_rows()):
+            row[:] = letters
+        self.placements = dict(placed)
+        self.density = packer.density()
+        definitions = dict(words)
+        return [(word, definitions[word]) for word, _ in placed]
+
+    def line_cells(self, node, direction, orientation, length):
+        dr, dc = self.DIRECTION_STEPS[direction]
+        return [(node[0] + i * dr * orientation, node[1] + i * dc * orientation) for i in range(length)]
+
+    def is_valid_assignment(self, word, node, direction, orientation):
+        if direction not in self.DIRECTION_STEPS:
+            return False
+        return all(0 <= row < self.rows and 0 <= col < self.cols and self.grid[row][col] in (' ', letter)
+                   for (row, col), letter in zip(self.line_cells(node, direction, orientation, len(word)), word))
+
+    def assign_word(self, word, node, direction, orientation):
+        # Writes the word exactly as validated (orientation -1 is the reversed
+        # placement) and records which cells were blank, so unassign_word clears
+        # only those and keeps letters shared with earlier words
+        written = []
+        for (row, col), letter in zip(self.line_cells(node, direction, orientation, len(word)), word):
+            if self.grid[row][col] == ' ':
+                self.grid[row][col] = letter
+                written.append((row, col))
+        self.trail.append(written)
+
+    def unassign_word(self, word, node, direction, orientation):
+        for row, col in self.trail.pop():
+            self.grid[row][col] = ' '
+
+class WordSearchCSP:
+    def __init__(self, grid_size, trie, rng=None, mask=None):
+        # mask, a shapes.Mask, gives the board its own shape and size instead of
+        # a grid_size x grid_size square
+        self.grid_size = grid_size
+        if mask is not None:
+            grid = mask.blank_grid()
+        else:
+            grid = [[' ' for _ in range(grid_size)] for _ in range(grid_size)]
+        self.word_search_graph = WordSearchGraph(grid, rng)
+        self.trie = trie
+        self.words = trie.get_all_words()
+
+    def solve(self, heuristic=False, max_backtracks=None, stats=None, restart_unit=None, stop=None,
+              target=None, max_seconds=None):
+        # heuristic places the most constrained words first with forward checking;
+        # max_backtracks bounds the search, after which solve() returns False with
+        # word_search_graph.status == 'budget_exhausted'. The search's counters end
+        # up in word_search_graph.stats (or in stats, a SolverStats, if given).
+        # restart_unit, stop, target and max_seconds are passed to word_search_csp.
+        return self.word_search_graph.word_search_csp(self.words, heuristic=heuristic,
+                                                      max_backtracks=max_backtracks, stats=stats,
+                                                      restart_unit=restart_unit, stop=stop, target=target,
+                                                      max_seconds=max_seconds)
+
+    def pack(self, time_budget=0.5, min_length=3, stats=None):
+        # Dense mode: instead of placing every word, packs as many of the trie's
+        # words as fit (use a large trie) and returns the (word, definition)
+        # pairs that made it onto the board
+        return self.word_search_graph.pack_words(self.words, time_budget, min_length, stats)
+
+    def display_grid(self):
+        for row in self.word_search_graph.grid:
+            print(' '.join(row))
+
+
+
+def find_selected_word(grid, start_pos, end_pos):
+    if not start_pos or not end_pos:
+        return ""
+    start_row, start_col = start_pos
+    end_row, end_col = end_pos
+
+    if start_row == end_row:
+        # Horizontal selection
+        if start_col < end_col:
+            return ''.join(grid[start_row][start_col:end_col + 1])
+        else:
+            return ''.join(grid[start_row][end_col:start_col + 1][::-1])
+    elif start_col == end_col:
+        # Vertical selection
+        if start_row < end_row:
+            return ''.join(grid[row][start_col] for row in range(start_row, end_row + 1))
+        else:
+            return ''.join(grid[row][start_col] for row in range(end_row, start_row + 1)[::-1])
+    elif abs(start_row - end_row) == abs(start_col - end_col):
+        # Diagonal selection
+        if start_row < end_row:
+            if start_col < end_col:
+                return ''.join(grid[start_row + i][start_col + i] for i in range(end_row - start_row + 1))
+            else:
+                return ''.join(grid[start_row + i][start_col - i] for i in range(end_row - start_row + 1))
+        else:
+            if start_col < end_col:
+                return ''.join(grid[start_row - i][start_col + i] for i in range(start_row - end_row + 1))
+            else:
+                return ''.join(grid[start_row - i][start_col - i] for i in range(start_row - end_row + 1))
+
+    return ""
+
+
+def get_cells_between(start_pos, end_pos):
+    cells = set()
+    if start_pos and end_pos:
+        start_row, start_col = start_pos
+        end_row, end_col = end_pos
+
+        if start_row == end_row:
+            # Horizontal selection
+            if start_col < end_col:
+                for col in range(start_col, end_col + 1):
+                    cells.add((start_row, col))
+            else:
+                for col in range(end_col, start_col + 1):
+                    cells.add((start_row, col))
+        elif start_col == end_col:
+            # Vertical selection
+            if start_row < end_row:
+                for row in range(start_row, end_row + 1):
+                    cells.add((row, start_col))
+            else:
+                for row in range(end_row, start_row + 1):
+                    cells.add((row, start_col))
+        elif abs(start_row - end_row) == abs(start_col - end_col):
+            # Diagonal selection
+            if start_row < end_row:
+                if start_col < end_col:
+                    for i in range(end_row - start_row + 1):
+                        cells.add((start_row + i, start_col + i))
+                else:
+                    for i in range(end_row - start_row + 1):
+                        cells.add((start_row + i, start_col - i))
+            else:
+                if start_col < end_col:
+                    for i in range(start_row - end_row + 1):
+                        cells.add((start_row - i, start_col + i))
+                else:
+                    for i in range(start_row - end_row + 1):
+                        cells.add((start_row - i, start_col - i))
+    return cells
+
+
+class LineIndex:
+    # Selection lookups for one board. A selection from start to end lies on the
+    # ray leaving start in one of the eight directions; each ray's letters and cells
+    # are built once, on first use, so resolving a drag or a mouse-up is a dict
+    # lookup and a slice instead of rebuilding strings and cell sets. Selections
+    # that are not straight lines resolve to "" and (). placements (word -> cells)
+    # lets placed_word() answer "is this exactly a placed word" from a hash.
+    def __init__(self, grid, placements=None):
+        self.grid = grid
+        self.rows = len(grid)
+        self.cols = len(grid[0]) if self.rows else 0
+        self._rays = {}
+        self._placed = {}
+        for word, cells in (placements or {}).items():
+            self._placed[(tuple(cells[0]), tuple(cells[-1]))] = word
+
+    def _ray(self, start, end):
+        d_row = end[0] - start[0]
+        d_col = end[1] - start[1]
+        if d_row and d_col and abs(d_row) != abs(d_col):
+            return None, 0
+        step = ((d_row > 0) - (d_row < 0), (d_col > 0) - (d_col < 0)) if d_row or d_col else (0, 1)
+        key = (start, step)
+        ray = self._rays.get(key)
+        if ray is None:
+            row, col = start
+            if not (0 <= row < self.rows and 0 <= col < self.cols):
+                return None, 0
+            cells = []
+            while 0 <= row < self.rows and 0 <= col < self.cols:
+                cells.append((row, col))
+                row += step[0]
+                col += step[1]
+            ray = self._rays[key] = (''.join(self.grid[r][c] for r, c in cells), tuple(cells))
+        return ray, max(abs(d_row), abs(d_col)) + 1
+
+    def word(self, start, end):
+        ray, length = self._ray(start, end)
+        return ray[0][:length] if ray else ""
+
+    def cells(self, start, end):
+        ray, length = self._ray(start, end)
+        return ray[1][:length] if ray else ()
+
+    def placed_word(self, start, end):
+        # The placed word read from start to end, or None
+        return self._placed.get((start, end))
+
+
+def generate_puzzle(word_list, grid_size, max_backtracks=20000, seed=None, stats=None, restart_unit=None,
+                    stop=None, difficulty=None, shape=None, max_seconds=None):
+    # Builds a finished board for word_list without touching pygame, so it can run
+    # in worker processes. Returns None when the words could not be placed. The
+    # same word list, size and seed always give the same board; without a seed one
+    # is picked and recorded in the result so the board can be rebuilt later.
+    # stats, a placement.SolverStats, collects what the solve did either way.
+    # restart_unit turns on Luby restarts (see WordSearchGraph.word_search_csp);
+    # the seed still fixes the board, since every run draws from the same rng.
+    # difficulty ('easy', 'medium', 'hard' or a DifficultyTarget) builds the board
+    # to that target in one pass and records the score it reached. shape (see
+    # shapes.make_mask) shapes the board; cells outside it are BLOCKED in 'grid'.
+    # max_seconds caps the solve in wall time, as max_backtracks alone does not.
+    # Whether it is hit depends on the machine, so leave it None when the seed
+    # must give the same result everywhere; stats.status is 'timed_out' when it
+    # was. A board found within the cap is the same one the uncapped solve gives.
+    # When the filler can't keep a placed word from showing up twice (or a
+    # banned word out), the words are placed again, up to FILL_ATTEMPTS times.
+    if seed is None:
+        seed = random.randrange(2 ** 32)
+    rng = random.Random(seed)
+    trie = Trie()
+    for word, definition in word_list:
+        trie.insert(word, definition)
+    target = get_target(difficulty) if difficulty is not None else None
+    mask = make_mask(shape, grid_size) if shape is not None else None
+    for _ in range(FILL_ATTEMPTS):
+        word_search_csp = WordSearchCSP(grid_size, trie, rng, mask)
+        if not word_search_csp.solve(heuristic=True, max_backtracks=max_backtracks, stats=stats,
+                                    restart_unit=restart_unit, stop=stop, target=target, max_seconds=max_seconds):
+            return None
+        graph = word_search_csp.word_search_graph
+        if graph.fill_empty_spaces() is not None:
+            break
+    else:
+        return None
+    puzzle = {
+        'seed': seed,
+        'grid_size': grid_size,
+        'words': [list(pair) for pair in word_list],
+        'grid': [''.join(row) for row in graph.grid],
+        'placements': {word: [list(cell) for cell in cells] for word, cells in graph.placements.items()},
+    }
+    if shape is not None:
+        puzzle['shape'] = shape if isinstance(shape, str) else None
+    if target is not None:
+        puzzle['difficulty'] = dict(graph.difficulty, target=difficulty if isinstance(difficulty, str) else None,
+                                    target_score=target.score(len(word_list)))
+    return puzzle
+
+
+def pack_puzzle(word_list, grid_size, time_budget=0.5, seed=None, min_length=3, stats=None, shape=None):
+    # A dense board packed from a large word_list (see WordSearchCSP.pack), in the
+    # same shape as generate_puzzle() with 'words' being the words that made it
+    # and 'density' the share of cells they cover. Returns None when not even one
+    # word fits. The seed rebuilds the board as long as packing finished inside
+    # time_budget. shape is as for generate_puzzle(), and so is placing the
+    # words again when the filler fails.
+    if seed is None:
+        seed = random.randrange(2 ** 32)
+    rng = random.Random(seed)
+    trie = Trie()
+    for word, definition in word_list:
+        trie.insert(word, definition)
+    mask = make_mask(shape, grid_size) if shape is not None else None
+    for _ in range(FILL_ATTEMPTS):
+        word_search_csp = WordSearchCSP(grid_size, trie, rng, mask)
+        words = word_search_csp.pack(time_budget, min_length, stats)
+        if not words:
+            return None
+        graph = word_search_csp.word_search_graph
+        density = graph.density
+        if graph.fill_empty_spaces() is not None:
+            break
+    else:
+        return None
+    puzzle = {
+        'seed': seed,
+        'grid_size': grid_size,
+        'words': [list(pair) for pair in words],
+        'grid': [''.join(row) for row in graph.grid],
+        'placements': {word: [list(cell) for cell in cells] for word, cells in graph.placements.items()},
+        'density': round(density, 3),
+    }
+    if shape is not None:
+        puzzle['shape'] = shape if isinstance(shape, str) else None
+    return puzzle
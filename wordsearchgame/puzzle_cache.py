@@ -0,0 +1,111 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+from placement import SolverStats
+from puzzle import generate_puzzle
+from solver_metrics import METRICS
+
+# Solve statuses that say nothing about the seed itself
+UNSETTLED = ('timed_out', 'cancelled')
+
+
+def word_list_hash(word_list):
+    # Content hash of a [(word, definition), ...] list; equal lists hash equal
+    # wherever they came from
+    data = json.dumps([list(pair) for pair in word_list], ensure_ascii=False, separators=(',', ':'))
+    return hashlib.sha256(data.encode('utf-8')).hexdigest()
+
+
+class PuzzleCache:
+    # Seeded boards keyed on (word list hash, grid size, seed). generate_puzzle is
+    # deterministic for a key, so a board is generated once and then served from
+    # memory (an LRU of `capacity` boards) or, when `directory` is set, from a JSON
+    # file there that outlives the process. Concurrent misses on the same key wait
+    # for the first one instead of generating the board again. A None is only
+    # kept when the search proved the words don't fit or ran out of backtracks;
+    # a solve that was stopped early (UNSETTLED) is tried again next time.
+    def __init__(self, capacity=256, directory=None):
+        self.capacity = capacity
+        self.directory = directory
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._puzzles = OrderedDict()
+        self._generating = {}
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def get(self, word_list, grid_size, seed, difficulty=None, shape=None):
+        # The board for this key, or None if the words don't fit at this size.
+        # difficulty is the name of a difficulty.DIFFICULTIES target and shape a
+        # shapes.make_mask description.
+        key = (word_list_hash(word_list), grid_size, seed, difficulty, shape)
+        with self._lock:
+            if key in self._puzzles:
+                self._puzzles.move_to_end(key)
+                self.hits += 1
+                return self._puzzles[key]
+            key_lock = self._generating.setdefault(key, threading.Lock())
+        with key_lock:
+            with self._lock:
+                # Another request may have filled it while this one waited
+                if key in self._puzzles:
+                    self.hits += 1
+                    return self._puzzles[key]
+            puzzle = self._read(key)
+            if puzzle is not None:
+                hit = 'disk'
+            else:
+                hit = None
+                settled = True
+                stats = SolverStats()
+                puzzle = generate_puzzle(word_list, grid_size, seed=seed, stats=stats, difficulty=difficulty,
+                                         shape=shape)
+                METRICS.record(stats, grid_size, word_list)
+                if puzzle is not None:
+                    self._write(key, puzzle)
+                else:
+                    settled = stats.status not in UNSETTLED
+            with self._lock:
+                if hit:
+                    self.disk_hits += 1
+                else:
+                    self.misses += 1
+                self._generating.pop(key, None)
+                if hit or settled:
+                    self._puzzles[key] = puzzle
+                    if len(self._puzzles) > self.capacity:
+                        self._puzzles.popitem(last=False)
+        return puzzle
+
+    def _path(self, key):
+        digest, grid_size, seed, difficulty, shape = key
+        suffix = ''.join(f"-{part.replace(':', '_')}" for part in (difficulty, shape) if part)
+        return os.path.join(self.directory, f"{digest[:32]}-{grid_size}-{seed}{suffix}.json")
+
+    def _read(self, key):
+        if not self.directory:
+            return None
+        try:
+            with open(self._path(key), encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write(self, key, puzzle):
+        if not self.directory:
+            return
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(puzzle, f)
+        os.replace(tmp_path, path)
+
+    def stats(self):
+        with self._lock:
+            return {'size': len(self._puzzles), 'capacity': self.capacity, 'hits': self.hits,
+                    'disk_hits': self.disk_hits, 'misses': self.misses}
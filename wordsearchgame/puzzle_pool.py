@@ -0,0 +1,178 @@
+import queue
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+
+from placement import SolverStats
+from portfolio import Portfolio
+from puzzle import MAX_SOLVE_SECONDS, generate_puzzle
+from solver_metrics import METRICS
+
+
+def _timed_generate(word_list, grid_size, difficulty=None, shape=None):
+    # Runs in the worker; the stats travel back with the board so the solver
+    # metrics are kept in the serving process
+    stats = SolverStats()
+    start = time.perf_counter()
+    puzzle = generate_puzzle(word_list, grid_size, stats=stats, difficulty=difficulty, shape=shape,
+                             max_seconds=MAX_SOLVE_SECONDS)
+    return puzzle, time.perf_counter() - start, stats
+
+
+def pool_key(word_list, grid_size, difficulty=None, shape=None):
+    return tuple(tuple(pair) for pair in word_list), grid_size, difficulty, shape
+
+
+class PuzzlePool:
+    # Keeps up to `capacity` ready boards per (word list, grid size) and refills
+    # them on a process pool, so serving a game is a deque pop instead of a solve.
+    # Refills are queued to a background thread so get() never waits on the
+    # executor. With portfolio=N a cold miss races N seeded solvers (see
+    # portfolio.Portfolio) instead of solving in the calling thread. The race has
+    # its own N workers, so it never waits behind queued refills.
+    # Only the `max_keys` most recently asked-for keys keep boards. A key whose
+    # last `capacity` solves all failed is given up on: get() returns None for
+    # it straight away and nothing more is queued for it.
+    def __init__(self, capacity=8, workers=None, portfolio=None, max_keys=64):
+        self.capacity = capacity
+        self.max_keys = max_keys
+        self._executor = ProcessPoolExecutor(max_workers=workers)
+        self.portfolio = Portfolio.start(workers=portfolio, solvers=portfolio) if portfolio else None
+        self._lock = threading.Lock()
+        self._ready = OrderedDict()
+        self._pending = {}
+        self._failed_in_a_row = {}
+        self._unplaceable = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.generated = 0
+        self.failures = 0
+        self.runs = 0
+        self.generation_seconds = 0.0
+        self.last_refill = None
+        self._refill_requests = queue.Queue()
+        self._refiller = threading.Thread(target=self._refill_loop, daemon=True)
+        self._refiller.start()
+
+    def warm(self, word_lists, grid_sizes):
+        for word_list in word_lists:
+            for grid_size in grid_sizes:
+                self._refill_requests.put(pool_key(word_list, grid_size))
+
+    def get(self, word_list, grid_size, difficulty=None, shape=None):
+        # Pops a ready board, falling back to generating one in the calling thread
+        # when the pool for this key is cold or drained. Returns None only when
+        # the words cannot be placed on a board of this size. Each difficulty
+        # (a difficulty.DIFFICULTIES name) and shape (a shapes.make_mask
+        # description) has its own boards.
+        key = pool_key(word_list, grid_size, difficulty, shape)
+        with self._lock:
+            if key in self._unplaceable:
+                self.misses += 1
+                return None
+            ready = self._ready.get(key)
+            puzzle = ready.popleft() if ready else None
+            if puzzle is not None:
+                self.hits += 1
+                self._ready.move_to_end(key)
+            else:
+                self.misses += 1
+        if puzzle is None and self.portfolio is not None:
+            # Refills for this key are queued only once the race is decided, so
+            # they don't compete with it for the cores
+            puzzle = self.portfolio.race(word_list, grid_size, difficulty=difficulty, shape=shape)
+        self._refill_requests.put(key)
+        if puzzle is None and self.portfolio is None:
+            puzzle, _, stats = _timed_generate(word_list, grid_size, difficulty, shape)
+            METRICS.record(stats, grid_size, word_list)
+        if puzzle is None:
+            with self._lock:
+                self._failed(key)
+        return puzzle
+
+    def _failed(self, key):
+        # Called with the lock held
+        failed = self._failed_in_a_row[key] = self._failed_in_a_row.get(key, 0) + 1
+        if failed >= self.capacity:
+            self._unplaceable[key] = True
+            if len(self._unplaceable) > self.max_keys:
+                self._unplaceable.popitem(last=False)
+            self._ready.pop(key, None)
+            self._failed_in_a_row.pop(key, None)
+
+    def _refill_loop(self):
+        while True:
+            key = self._refill_requests.get()
+            if key is None:
+                return
+            self._refill(key)
+
+    def _refill(self, key):
+        with self._lock:
+            if key in self._unplaceable:
+                return
+            ready = self._ready.get(key)
+            if ready is None:
+                ready = self._ready[key] = deque()
+                if len(self._ready) > self.max_keys:
+                    evicted, _ = self._ready.popitem(last=False)
+                    self._failed_in_a_row.pop(evicted, None)
+            self._ready.move_to_end(key)
+            missing = self.capacity - len(ready) - self._pending.get(key, 0)
+            if missing <= 0:
+                return
+            self._pending[key] = self._pending.get(key, 0) + missing
+        word_list, grid_size, difficulty, shape = key
+        for _ in range(missing):
+            future = self._executor.submit(_timed_generate, word_list, grid_size, difficulty, shape)
+            future.add_done_callback(lambda future, key=key: self._refilled(key, future))
+
+    def _refilled(self, key, future):
+        with self._lock:
+            self._pending[key] -= 1
+            if future.cancelled() or future.exception() is not None:
+                self.failures += 1
+                return
+            puzzle, seconds, stats = future.result()
+            METRICS.record(stats, key[1], key[0])
+            self.runs += 1
+            self.generation_seconds += seconds
+            self.last_refill = time.time()
+            if puzzle is None:
+                self.failures += 1
+                self._failed(key)
+                return
+            self.generated += 1
+            self._failed_in_a_row.pop(key, None)
+            ready = self._ready.get(key)
+            if ready is not None:
+                ready.append(puzzle)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'capacity': self.capacity,
+                'hits': self.hits,
+                'misses': self.misses,
+                'generated': self.generated,
+                'failures': self.failures,
+                'mean_generation_ms': 1000 * self.generation_seconds / self.runs if self.runs else None,
+                'last_refill': self.last_refill,
+                'portfolio': self.portfolio.stats() if self.portfolio is not None else None,
+                'unplaceable_keys': len(self._unplaceable),
+                'keys': [{'words': [word for word, _ in key[0]],
+                          'grid_size': key[1],
+                          'difficulty': key[2],
+                          'shape': key[3],
+                          'ready': len(ready),
+                          'pending': self._pending.get(key, 0)}
+                         for key, ready in self._ready.items()],
+            }
+
+    def shutdown(self):
+        self._refill_requests.put(None)
+        self._refiller.join()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        if self.portfolio is not None:
+            self.portfolio.shutdown()
@@ -0,0 +1,78 @@
+import string
+from collections import OrderedDict
+
+import pygame
+
+# Fonts, glyphs and text surfaces are created once and reused every frame
+_fonts = {}
+_atlases = {}
+_texts = OrderedDict()
+TEXT_CACHE_SIZE = 512
+
+
+def get_font(size):
+    if size not in _fonts:
+        _fonts[size] = pygame.font.Font(None, size)
+    return _fonts[size]
+
+
+def render_text(text, size, color):
+    # Cached font.render() for HUD strings such as scores, timers and clues
+    key = (text, size, color)
+    surface = _texts.get(key)
+    if surface is None:
+        surface = get_font(size).render(text, True, color)
+        _texts[key] = surface
+        if len(_texts) > TEXT_CACHE_SIZE:
+            _texts.popitem(last=False)
+    else:
+        _texts.move_to_end(key)
+    return surface
+
+
+class GlyphAtlas:
+    # All upper and lower case letters in every requested colour, rendered into one
+    # surface: one row per colour, one fixed-width column per letter. Drawing a
+    # letter is a blit of its area of the atlas.
+    def __init__(self, size, colors, chars=string.ascii_uppercase + string.ascii_lowercase):
+        self.size = size
+        font = get_font(size)
+        rendered = {(char, color): font.render(char, True, color) for color in colors for char in chars}
+        cell_width = max(surface.get_width() for surface in rendered.values())
+        cell_height = font.get_linesize()
+        self.surface = pygame.Surface((cell_width * len(chars), cell_height * len(colors)), pygame.SRCALPHA)
+        self.areas = {}
+        for row, color in enumerate(colors):
+            for col, char in enumerate(chars):
+                glyph = rendered[(char, color)]
+                area = pygame.Rect(col * cell_width, row * cell_height, glyph.get_width(), glyph.get_height())
+                self.surface.blit(glyph, area, special_flags=pygame.BLEND_RGBA_MAX)
+                self.areas[(char, color)] = area
+
+    def blit(self, target, char, color, center):
+        area = self.areas.get((char, color))
+        if area is None:
+            # Anything outside the atlas (blank cells, digits) goes through the text cache
+            glyph = render_text(char, self.size, color)
+            target.blit(glyph, glyph.get_rect(center=center))
+            return
+        target.blit(self.surface, (center[0] - area.width // 2, center[1] - area.height // 2), area)
+
+
+def glyph_atlas(size, colors):
+    key = (size, tuple(colors))
+    if key not in _atlases:
+        _atlases[key] = GlyphAtlas(size, colors)
+    return _atlases[key]
+
+
+_cell_rects = {}
+
+
+def cell_rects(rows, cols, block_size):
+    # One reusable pygame.Rect per cell, indexed [row][col]
+    key = (rows, cols, block_size)
+    if key not in _cell_rects:
+        _cell_rects[key] = [[pygame.Rect(j * block_size, i * block_size, block_size, block_size)
+                             for j in range(cols)] for i in range(rows)]
+    return _cell_rects[key]
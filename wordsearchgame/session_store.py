@@ -0,0 +1,332 @@
+import json
+import struct
+import threading
+import time
+from collections import OrderedDict
+
+try:
+    import redis
+except ImportError:  # only RedisBackend needs it
+    redis = None
+
+from compact_trie import CompactTrie
+from game_session import GameSession
+from puzzle_cache import word_list_hash
+
+SESSION_TTL = 3600  # seconds since a session was last touched
+MAX_SESSIONS = 200000
+
+# Word lists (and their tries) a SessionStore keeps in memory; the backend has them all
+MAX_WORD_LISTS = 1024
+
+# Locks InMemoryBackend.update() spreads games over
+LOCK_STRIPES = 64
+
+
+def line_cells(start, end):
+    # The cells of the straight line from start to end, both included
+    (start_row, start_col), (end_row, end_col) = start, end
+    d_row, d_col = end_row - start_row, end_col - start_col
+    steps = max(abs(d_row), abs(d_col))
+    step_row, step_col = (d_row > 0) - (d_row < 0), (d_col > 0) - (d_col < 0)
+    return [(start_row + i * step_row, start_col + i * step_col) for i in range(steps + 1)]
+
+
+def word_list_key(words):
+    # 16 bytes of the list's content hash, the same on every node
+    return bytes.fromhex(word_list_hash(words))[:16]
+
+
+class SessionRecord:
+    # A stored game: the grid as UTF-8 bytes (rows concatenated), found words as a
+    # bitset over the word list (bit i set = words[i] found), and the score and
+    # deadline as ints. The word list itself is stored once in the backend and
+    # referenced by words_key (see word_list_key). cols is the row length the grid
+    # is cut back into (shaped boards need not be square). ends holds where each
+    # word was placed as (start, end) cells in word list order, or is empty when
+    # the board came without placements. `touched` is the last access time, kept
+    # by InMemoryBackend for the TTL.
+    __slots__ = ('game_id', 'words_key', 'cols', 'grid', 'found', 'score', 'deadline', 'seed', 'ends',
+                 'touched')
+
+    # words_key, cols, found byte count, placed word count, score, deadline, seed (-1 = none)
+    _HEADER = struct.Struct('<16sHHHqqq')
+    # start row, start col, end row, end col of one placed word
+    _ENDS = struct.Struct('<HHHH')
+
+    def __init__(self, game_id, words_key, cols, grid, found, score, deadline, seed, ends=()):
+        self.game_id = game_id
+        self.words_key = words_key
+        self.cols = cols
+        self.grid = grid
+        self.ends = list(ends)
+        self.found = found
+        self.score = score
+        self.deadline = deadline
+        self.seed = seed
+        self.touched = 0
+
+    def to_bytes(self):
+        found = self.found.to_bytes((self.found.bit_length() + 7) // 8, 'little')
+        seed = -1 if self.seed is None else self.seed
+        ends = b''.join(self._ENDS.pack(*start, *end) for start, end in self.ends)
+        return self._HEADER.pack(self.words_key, self.cols, len(found), len(self.ends), self.score,
+                                 self.deadline, seed) + found + ends + self.grid
+
+    @classmethod
+    def from_bytes(cls, game_id, data):
+        words_key, cols, found_size, placed, score, deadline, seed = cls._HEADER.unpack_from(data)
+        start = cls._HEADER.size
+        found = int.from_bytes(data[start:start + found_size], 'little')
+        start += found_size
+        ends = []
+        for _ in range(placed):
+            start_row, start_col, end_row, end_col = cls._ENDS.unpack_from(data, start)
+            ends.append(((start_row, start_col), (end_row, end_col)))
+            start += cls._ENDS.size
+        return cls(game_id, words_key, cols, bytes(data[start:]), found, score, deadline,
+                   None if seed == -1 else seed, ends)
+
+
+class InMemoryBackend:
+    # Records in one OrderedDict in least recently used order. Every session shares
+    # the same TTL, so the least recently used record is also the first to expire:
+    # expiry and the size cap both only ever drop records from the front.
+    def __init__(self, ttl=SESSION_TTL, max_sessions=MAX_SESSIONS, now=time.time):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.now = now
+        self._records = OrderedDict()
+        self._word_lists = {}
+        self._lock = threading.Lock()
+        self._update_locks = [threading.Lock() for _ in range(LOCK_STRIPES)]
+        self.expired = 0
+        self.evicted = 0
+
+    def get(self, game_id):
+        with self._lock:
+            now = int(self.now())
+            self._expire(now)
+            record = self._records.get(game_id)
+            if record is not None:
+                record.touched = now
+                self._records.move_to_end(game_id)
+            return record
+
+    def put(self, record):
+        with self._lock:
+            now = int(self.now())
+            record.touched = now
+            self._records[record.game_id] = record
+            self._records.move_to_end(record.game_id)
+            self._expire(now)
+            while len(self._records) > self.max_sessions:
+                self._records.popitem(last=False)
+                self.evicted += 1
+
+    def update(self, game_id, change):
+        # Replaces the record with change(record) with no other update to the same
+        # game in between; returns the new record, or None if there is none
+        with self._update_locks[hash(game_id) % LOCK_STRIPES]:
+            record = self.get(game_id)
+            if record is None:
+                return None
+            record = change(record)
+            self.put(record)
+            return record
+
+    def delete(self, game_id):
+        with self._lock:
+            self._records.pop(game_id, None)
+
+    def put_words(self, key, data):
+        with self._lock:
+            self._word_lists[key] = data
+
+    def get_words(self, key):
+        with self._lock:
+            return self._word_lists.get(key)
+
+    def _expire(self, now):
+        records = self._records
+        while records:
+            game_id = next(iter(records))
+            if records[game_id].touched + self.ttl > now:
+                break
+            del records[game_id]
+            self.expired += 1
+
+    def stats(self):
+        with self._lock:
+            return {'backend': 'memory', 'sessions': len(self._records), 'max_sessions': self.max_sessions,
+                    'ttl': self.ttl, 'expired': self.expired, 'evicted': self.evicted}
+
+
+class RedisBackend:
+    # Records as packed bytes under `prefix + game_id` in Redis or anything that
+    # speaks its protocol. Redis does the TTL (refreshed on every access) and, with
+    # an allkeys-lru maxmemory policy, the LRU eviction.
+    def __init__(self, client, ttl=SESSION_TTL, prefix='wordsearch:session:'):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = prefix
+
+    @classmethod
+    def from_url(cls, url, **kwargs):
+        if redis is None:
+            raise RuntimeError("the redis package is needed for a redis:// session store")
+        return cls(redis.Redis.from_url(url), **kwargs)
+
+    def get(self, game_id):
+        key = self.prefix + game_id
+        data = self.client.getex(key, ex=self.ttl)
+        if data is None:
+            return None
+        return SessionRecord.from_bytes(game_id, data)
+
+    def put(self, record):
+        self.client.set(self.prefix + record.game_id, record.to_bytes(), ex=self.ttl)
+
+    def update(self, game_id, change):
+        # Optimistic: WATCH the key, and start over if another client wrote it
+        # before this write went through
+        key = self.prefix + game_id
+        with self.client.pipeline() as pipe:
+            while True:
+                try:
+                    pipe.watch(key)
+                    data = pipe.get(key)
+                    if data is None:
+                        return None
+                    record = change(SessionRecord.from_bytes(game_id, data))
+                    pipe.multi()
+                    pipe.set(key, record.to_bytes(), ex=self.ttl)
+                    pipe.execute()
+                    return record
+                except redis.WatchError:
+                    continue
+
+    def delete(self, game_id):
+        self.client.delete(self.prefix + game_id)
+
+    def put_words(self, key, data):
+        # Word lists are shared by every game playing them, so they don't expire
+        self.client.set(self.prefix + 'words:' + key.hex(), data)
+
+    def get_words(self, key):
+        return self.client.get(self.prefix + 'words:' + key.hex())
+
+    def stats(self):
+        return {'backend': 'redis', 'ttl': self.ttl}
+
+
+class SessionStore:
+    # Saves GameSessions as SessionRecords and brings them back. Word lists are
+    # keyed by a hash of their contents and written to the backend the first time
+    # this store sees them, so every node sharing the backend can load any game.
+    # The most recent MAX_WORD_LISTS lists are also kept here with their tries,
+    # which every session playing them shares; with a trie holding every word
+    # (the mapped dictionary's), all sessions use that one instead.
+    def __init__(self, backend=None, trie=None):
+        self.backend = backend or InMemoryBackend()
+        self.shared_trie = trie
+        self._lock = threading.Lock()
+        self._word_lists = OrderedDict()
+
+    def _word_list(self, key, words=None):
+        # (words, trie) for key; words, when given, are the list itself, and
+        # otherwise it is read back from the backend. None if no node stored it.
+        with self._lock:
+            entry = self._word_lists.get(key)
+            if entry is not None:
+                self._word_lists.move_to_end(key)
+                return entry
+        if words is None:
+            data = self.backend.get_words(key)
+            if data is None:
+                return None
+            words = [tuple(pair) for pair in json.loads(data)]
+        else:
+            words = [tuple(pair) for pair in words]
+            self.backend.put_words(key, json.dumps(words, ensure_ascii=False).encode('utf-8'))
+        entry = (words, self.shared_trie or CompactTrie(words))
+        with self._lock:
+            self._word_lists[key] = entry
+            if len(self._word_lists) > MAX_WORD_LISTS:
+                self._word_lists.popitem(last=False)
+        return entry
+
+    def trie(self, words):
+        return self._word_list(word_list_key(words), words)[1]
+
+    def _record(self, session):
+        words_key = word_list_key(session.words)
+        self._word_list(words_key, session.words)
+        found = 0
+        for i, (word, _) in enumerate(session.words):
+            if word in session.found_words:
+                found |= 1 << i
+        grid = ''.join(''.join(row) for row in session.grid).encode('utf-8')
+        placements = session.placements or {}
+        ends = []
+        if all(placements.get(word) for word, _ in session.words):
+            ends = [(tuple(placements[word][0]), tuple(placements[word][-1])) for word, _ in session.words]
+        return SessionRecord(session.game_id, words_key, session.cols, grid, found,
+                             session.score, session.deadline, session.seed, ends)
+
+    def _session(self, record):
+        entry = self._word_list(record.words_key)
+        if entry is None:
+            return None
+        words, trie = entry
+        letters = record.grid.decode('utf-8')
+        cols = record.cols
+        grid = [letters[i:i + cols] for i in range(0, len(letters), cols)]
+        puzzle = {
+            'seed': record.seed,
+            'grid_size': max(len(grid), cols),
+            'words': words,
+            'grid': grid,
+        }
+        if record.ends:
+            puzzle['placements'] = {word: line_cells(start, end)
+                                    for (word, _), (start, end) in zip(words, record.ends)}
+        session = GameSession(puzzle, game_id=record.game_id, trie=trie)
+        session.found_words = {word for i, (word, _) in enumerate(words) if record.found >> i & 1}
+        session.score = record.score
+        session.deadline = record.deadline
+        return session
+
+    def save(self, session):
+        self.backend.put(self._record(session))
+
+    def load(self, game_id):
+        # The session for game_id, or None if it never existed or has been evicted
+        record = self.backend.get(game_id)
+        if record is None:
+            return None
+        return self._session(record)
+
+    def update(self, game_id, play):
+        # Loads the game, calls play(session) and saves it, with no other update
+        # to the same game in between, even from another node sharing a Redis
+        # backend. Returns (session, what play returned), or (None, None) if the
+        # game is gone. play may run more than once when updates collide.
+        outcome = [None, None]
+
+        def change(record):
+            session = self._session(record)
+            if session is None:  # its word list is gone; leave the record be
+                return record
+            outcome[:] = [session, play(session)]
+            return self._record(session)
+
+        if self.backend.update(game_id, change) is None:
+            return None, None
+        return tuple(outcome)
+
+    def delete(self, game_id):
+        self.backend.delete(game_id)
+
+    def stats(self):
+        return self.backend.stats()
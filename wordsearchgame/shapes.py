@@ -0,0 +1,143 @@
+import math
+
+# Grid character for a cell outside the board's shape. Placement never writes
+# there, the filler leaves it alone and the renderers skip it.
+BLOCKED = '#'
+
+# Longest side make_mask() accepts; slot tables and pooled boards are kept per
+# shape, so shapes are bounded like grid sizes
+MAX_SIDE = 60
+
+# 5x7 capitals for letter-shaped boards
+FONT = {
+    'A': ('.###.', '#...#', '#...#', '#####', '#...#', '#...#', '#...#'),
+    'B': ('####.', '#...#', '#...#', '####.', '#...#', '#...#', '####.'),
+    'C': ('.####', '#....', '#....', '#....', '#....', '#....', '.####'),
+    'D': ('####.', '#...#', '#...#', '#...#', '#...#', '#...#', '####.'),
+    'E': ('#####', '#....', '#....', '####.', '#....', '#....', '#####'),
+    'F': ('#####', '#....', '#....', '####.', '#....', '#....', '#....'),
+    'G': ('.####', '#....', '#....', '#.###', '#...#', '#...#', '.###.'),
+    'H': ('#...#', '#...#', '#...#', '#####', '#...#', '#...#', '#...#'),
+    'I': ('#####', '..#..', '..#..', '..#..', '..#..', '..#..', '#####'),
+    'J': ('#####', '...#.', '...#.', '...#.', '...#.', '#..#.', '.##..'),
+    'K': ('#...#', '#..#.', '#.#..', '##...', '#.#..', '#..#.', '#...#'),
+    'L': ('#....', '#....', '#....', '#....', '#....', '#....', '#####'),
+    'M': ('#...#', '##.##', '#.#.#', '#.#.#', '#...#', '#...#', '#...#'),
+    'N': ('#...#', '##..#', '#.#.#', '#..##', '#...#', '#...#', '#...#'),
+    'O': ('.###.', '#...#', '#...#', '#...#', '#...#', '#...#', '.###.'),
+    'P': ('####.', '#...#', '#...#', '####.', '#....', '#....', '#....'),
+    'Q': ('.###.', '#...#', '#...#', '#...#', '#.#.#', '#..#.', '.##.#'),
+    'R': ('####.', '#...#', '#...#', '####.', '#.#..', '#..#.', '#...#'),
+    'S': ('.####', '#....', '#....', '.###.', '....#', '....#', '####.'),
+    'T': ('#####', '..#..', '..#..', '..#..', '..#..', '..#..', '..#..'),
+    'U': ('#...#', '#...#', '#...#', '#...#', '#...#', '#...#', '.###.'),
+    'V': ('#...#', '#...#', '#...#', '#...#', '#...#', '.#.#.', '..#..'),
+    'W': ('#...#', '#...#', '#...#', '#.#.#', '#.#.#', '##.##', '#...#'),
+    'X': ('#...#', '#...#', '.#.#.', '..#..', '.#.#.', '#...#', '#...#'),
+    'Y': ('#...#', '#...#', '.#.#.', '..#..', '..#..', '..#..', '..#..'),
+    'Z': ('#####', '....#', '...#.', '..#..', '.#...', '#....', '#####'),
+}
+
+
+class Mask:
+    # Which cells of a rows x cols board are in play: cells holds one byte per
+    # cell in row-major order, 1 for active and 0 for blocked.
+    def __init__(self, rows, cols, cells):
+        if len(cells) != rows * cols:
+            raise ValueError(f"a {rows}x{cols} mask needs {rows * cols} cells, got {len(cells)}")
+        self.rows = rows
+        self.cols = cols
+        self.cells = bytes(cells)
+
+    @classmethod
+    def from_rows(cls, rows):
+        # From strings or lists where anything but '.' and ' ' is active, e.g.
+        # ['.##.', '####', '.##.']
+        cols = max(len(row) for row in rows)
+        return cls(len(rows), cols, [int(j < len(row) and row[j] not in '. ')
+                                     for row in rows for j in range(cols)])
+
+    @classmethod
+    def from_grid(cls, grid):
+        # The shape of a grid of letters, where BLOCKED marks the cells outside it
+        return cls(len(grid), len(grid[0]), [int(letter != BLOCKED) for row in grid for letter in row])
+
+    @classmethod
+    def from_function(cls, rows, cols, inside):
+        # inside(x, y) with x, y the cell centre scaled to [0, 1]
+        return cls(rows, cols, [int(inside((j + 0.5) / cols, (i + 0.5) / rows))
+                                for i in range(rows) for j in range(cols)])
+
+    def active(self, row, col):
+        return 0 <= row < self.rows and 0 <= col < self.cols and self.cells[row * self.cols + col] == 1
+
+    def count(self):
+        return sum(self.cells)
+
+    def is_full(self):
+        return all(self.cells)
+
+    def blank_grid(self):
+        # An empty board of this shape for WordSearchGraph
+        return [[' ' if self.cells[i * self.cols + j] else BLOCKED for j in range(self.cols)]
+                for i in range(self.rows)]
+
+    def __eq__(self, other):
+        return isinstance(other, Mask) and (self.rows, self.cols, self.cells) == (other.rows, other.cols, other.cells)
+
+    def __hash__(self):
+        return hash((self.rows, self.cols, self.cells))
+
+
+def rectangle(rows, cols):
+    return Mask(rows, cols, [1] * (rows * cols))
+
+
+def circle(size):
+    return Mask.from_function(size, size, lambda x, y: (x - 0.5) ** 2 + (y - 0.5) ** 2 <= 0.25)
+
+
+def heart(size):
+    # Inside of (x^2 + y^2 - 1)^3 = x^2 y^3, scaled to fill the square
+    def inside(x, y):
+        x, y = (x - 0.5) * 2.4, (0.5 - y) * 2.3 + 0.12
+        return (x * x + y * y - 1) ** 3 - x * x * y ** 3 <= 0
+    return Mask.from_function(size, size, inside)
+
+
+def diamond(size):
+    return Mask.from_function(size, size, lambda x, y: abs(x - 0.5) + abs(y - 0.5) <= 0.5)
+
+
+def letter(char, size):
+    # char from FONT scaled up to size rows, keeping its 5:7 proportions
+    glyph = FONT[char.upper()]
+    cols = max(5, math.ceil(size * 5 / 7))
+    return Mask.from_function(size, cols, lambda x, y: glyph[min(6, int(y * 7))][min(4, int(x * 5))] == '#')
+
+
+SHAPES = {'square': lambda size: rectangle(size, size), 'circle': circle, 'heart': heart, 'diamond': diamond}
+
+
+def make_mask(shape, size):
+    # A Mask from a shape description: a Mask itself, a name in SHAPES,
+    # 'letter:K' for a capital, or 'ROWSxCOLS' for a rectangle (size is unused).
+    # Boards with a side longer than MAX_SIDE are refused.
+    if isinstance(shape, Mask):
+        return shape
+    description = str(shape)
+    rows, x, cols = description.partition('x')
+    rectangular = bool(x) and rows.isdigit() and cols.isdigit() and int(rows) > 0 and int(cols) > 0
+    if rectangular:
+        rows, cols = int(rows), int(cols)
+    elif shape in SHAPES or description.startswith('letter:') and description[7:].upper() in FONT:
+        rows = cols = size
+    else:
+        raise ValueError(f"unknown shape {shape!r}; use {', '.join(SHAPES)}, letter:A-Z or ROWSxCOLS")
+    if max(rows, cols) > MAX_SIDE:
+        raise ValueError(f"shape {shape!r} is larger than {MAX_SIDE}x{MAX_SIDE}")
+    if shape in SHAPES:
+        return SHAPES[shape](size)
+    if rectangular:
+        return rectangle(rows, cols)
+    return letter(description[7:], size)
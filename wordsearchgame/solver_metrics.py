@@ -0,0 +1,155 @@
+import bisect
+import contextlib
+import cProfile
+import itertools
+import os
+import threading
+import time
+
+try:
+    import pyinstrument
+except ImportError:  # only WORDSEARCH_PROFILE=pyinstrument needs it
+    pyinstrument = None
+
+# WORDSEARCH_PROFILE=cprofile or pyinstrument profiles every solve() and writes
+# one file per solve to WORDSEARCH_PROFILE_DIR (default: the working directory)
+PROFILE = os.environ.get('WORDSEARCH_PROFILE', '').lower()
+PROFILE_DIR = os.environ.get('WORDSEARCH_PROFILE_DIR', '.')
+
+SECONDS_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (0, 1, 10, 100, 1000, 10000, 100000, 1000000)
+
+_profile_ids = itertools.count()
+
+
+@contextlib.contextmanager
+def profiling(kind=None, directory=None):
+    # Profiles the block with cProfile (a .prof file for pstats/snakeviz) or
+    # pyinstrument (an .html report). Without a kind, or when neither is asked
+    # for in the environment, it does nothing.
+    kind = kind if kind is not None else PROFILE
+    if kind not in ('cprofile', 'pyinstrument'):
+        yield
+        return
+    if kind == 'pyinstrument' and pyinstrument is None:
+        raise RuntimeError("the pyinstrument package is needed for WORDSEARCH_PROFILE=pyinstrument")
+    directory = directory or PROFILE_DIR
+    name = os.path.join(directory, f"solve-{os.getpid()}-{next(_profile_ids)}")
+    if kind == 'cprofile':
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            profiler.dump_stats(name + '.prof')
+    else:
+        profiler = pyinstrument.Profiler()
+        profiler.start()
+        try:
+            yield
+        finally:
+            profiler.stop()
+            with open(name + '.html', 'w') as f:
+                f.write(profiler.output_html())
+
+
+class Histogram:
+    # Cumulative buckets like a Prometheus histogram: counts[i] is the number of
+    # observations <= bounds[i], and the last count (+Inf) is all of them.
+    def __init__(self, bounds):
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.sum = 0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        return list(itertools.accumulate(self.counts))
+
+    def as_dict(self):
+        labels = [str(bound) for bound in self.bounds] + ['+Inf']
+        return {'buckets': dict(zip(labels, self.cumulative())), 'sum': self.sum, 'count': self.count}
+
+    def prometheus(self, name):
+        labels = [repr(float(bound)) for bound in self.bounds] + ['+Inf']
+        lines = [f'# TYPE {name} histogram']
+        for label, count in zip(labels, self.cumulative()):
+            lines.append(f'{name}_bucket{{le="{label}"}} {count}')
+        lines.append(f'{name}_sum {self.sum}')
+        lines.append(f'{name}_count {self.count}')
+        return lines
+
+
+class SolverMetrics:
+    # Totals over every solve recorded: runs by status, histograms of wall time,
+    # backtracks and nodes, and the slowest solves with their words' own times,
+    # which is what points at the word lists and sizes worth tuning.
+    def __init__(self, slowest=10):
+        self._lock = threading.Lock()
+        self.keep_slowest = slowest
+        self.runs = {}
+        self.seconds = Histogram(SECONDS_BUCKETS)
+        self.backtracks = Histogram(COUNT_BUCKETS)
+        self.nodes = Histogram(COUNT_BUCKETS)
+        self.checks = 0
+        self.assignments = 0
+        self.slowest = []
+
+    def record(self, stats, grid_size=None, words=None):
+        with self._lock:
+            self.runs[stats.status] = self.runs.get(stats.status, 0) + 1
+            self.seconds.observe(stats.seconds)
+            self.backtracks.observe(stats.backtracks)
+            self.nodes.observe(stats.nodes)
+            self.checks += stats.checks
+            self.assignments += stats.assignments
+            if len(self.slowest) < self.keep_slowest or stats.seconds > self.slowest[-1]['seconds']:
+                slowest_words = sorted(stats.word_seconds.items(), key=lambda item: item[1], reverse=True)
+                self.slowest.append({
+                    'seconds': stats.seconds,
+                    'status': stats.status,
+                    'grid_size': grid_size,
+                    'words': len(words) if words is not None else len(stats.word_seconds),
+                    'max_depth': stats.max_depth,
+                    'backtracks': stats.backtracks,
+                    'slowest_words': slowest_words[:5],
+                    'at': time.time(),
+                })
+                self.slowest.sort(key=lambda run: run['seconds'], reverse=True)
+                del self.slowest[self.keep_slowest:]
+
+    def as_dict(self):
+        with self._lock:
+            return {
+                'runs': dict(self.runs),
+                'checks': self.checks,
+                'assignments': self.assignments,
+                'seconds': self.seconds.as_dict(),
+                'backtracks': self.backtracks.as_dict(),
+                'nodes': self.nodes.as_dict(),
+                'slowest': list(self.slowest),
+            }
+
+    def prometheus(self):
+        # Text exposition format, for a /metrics scrape
+        with self._lock:
+            lines = ['# TYPE wordsearch_solver_runs_total counter']
+            for status, count in sorted(self.runs.items()):
+                lines.append(f'wordsearch_solver_runs_total{{status="{status}"}} {count}')
+            lines.append('# TYPE wordsearch_solver_checks_total counter')
+            lines.append(f'wordsearch_solver_checks_total {self.checks}')
+            lines.append('# TYPE wordsearch_solver_assignments_total counter')
+            lines.append(f'wordsearch_solver_assignments_total {self.assignments}')
+            lines += self.seconds.prometheus('wordsearch_solver_seconds')
+            lines += self.backtracks.prometheus('wordsearch_solver_backtracks')
+            lines += self.nodes.prometheus('wordsearch_solver_nodes')
+            return '\n'.join(lines) + '\n'
+
+
+# Shared by the puzzle pool, the puzzle cache and the web apps
+METRICS = SolverMetrics()
@@ -0,0 +1,45 @@
+import asyncio
+import math
+import time
+
+
+class TimerWheel:
+    # Hashed timer wheel driven by one asyncio task. Timers land in the slot for
+    # the tick they are due on (plus whole turns of the wheel for long delays), so
+    # scheduling is O(1) and each tick only looks at one slot, however many games
+    # are running. Callbacks run on the event loop and must not block.
+    def __init__(self, resolution=0.1, slots=600, now=time.time):
+        self.resolution = resolution
+        self.now = now
+        self._slots = [[] for _ in range(slots)]
+        self._tick = 0
+        self._start = now()
+        self.pending = 0
+
+    def schedule(self, when, callback, *args):
+        # Runs callback(*args) at the first tick at or after wall-clock time `when`
+        ticks = max(1, math.ceil((when - self._start) / self.resolution) - self._tick)
+        rounds, offset = divmod(ticks - 1, len(self._slots))
+        self._slots[(self._tick + offset + 1) % len(self._slots)].append([rounds, callback, args])
+        self.pending += 1
+
+    def advance(self):
+        self._tick += 1
+        index = self._tick % len(self._slots)
+        due = []
+        later = []
+        for entry in self._slots[index]:
+            if entry[0]:
+                entry[0] -= 1
+                later.append(entry)
+            else:
+                due.append(entry)
+        self._slots[index] = later
+        for _, callback, args in due:
+            self.pending -= 1
+            callback(*args)
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(max(0.0, self._start + (self._tick + 1) * self.resolution - self.now()))
+            self.advance()
@@ -0,0 +1,178 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from collections import deque
+
+import requests
+from requests.adapters import HTTPAdapter
+
+WORD_FOUND_URL = 'http://127.0.0.1:5000/word_found'
+SPILL_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'word_events_spill.jsonl')
+
+# The spill file stops growing here; events past it are dropped and counted
+MAX_SPILL_BYTES = 1 << 20
+
+logger = logging.getLogger(__name__)
+
+
+class WordFoundEmitter:
+    # Word-found events are queued by emit() and posted in batches by a background
+    # thread over one keep-alive session, so the game loop never waits on the
+    # network. Batches that still fail after the retries are appended to a local
+    # JSONL spill file (up to max_spill_bytes) and re-sent ahead of new events
+    # once the server is back. Only the background thread touches the file: events
+    # emit() can't queue wait in an overflow buffer for it to spill.
+    def __init__(self, url=WORD_FOUND_URL, spill_path=SPILL_PATH, batch_size=20, flush_interval=2.0,
+                 retries=3, backoff=0.5, timeout=2.0, max_queue=10000, max_spill_bytes=MAX_SPILL_BYTES):
+        self.url = url
+        self.spill_path = spill_path
+        self.max_spill_bytes = max_spill_bytes
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.retries = retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=1))
+        self.session.mount('https://', HTTPAdapter(pool_connections=1, pool_maxsize=1))
+        self.sent = 0
+        self.spilled = 0
+        self.dropped = 0
+        self.requests_made = 0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._overflow = deque()
+        self._stopping = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def emit(self, word, definition):
+        event = {'word': word, 'definition': definition, 'time': time.time()}
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            self._overflow.append(event)
+
+    def close(self, timeout=5.0):
+        if self._stopping.is_set():
+            return
+        self._stopping.set()
+        self._thread.join(timeout)
+        self.session.close()
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            overflow = self._take_overflow()
+            if batch:
+                self._flush(batch)
+            if overflow:
+                self._spill(overflow)
+            if not batch and self._stopping.is_set() and self._queue.empty() and not self._overflow:
+                return
+
+    def _next_batch(self):
+        # Waits for the first event, then keeps collecting for up to flush_interval
+        # (or until batch_size) so words found close together share one request
+        batch = []
+        try:
+            batch.append(self._queue.get(timeout=self.flush_interval))
+        except queue.Empty:
+            return batch
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or self._stopping.is_set():
+                remaining = 0
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _take_overflow(self):
+        events = []
+        while self._overflow:
+            events.append(self._overflow.popleft())
+        return events
+
+    def _flush(self, batch):
+        # Sends the spilled events, then batch. The spill file is only changed once
+        # something has been sent: removed when everything went, rewritten with
+        # what is left when part of it did, and otherwise just appended to.
+        spilled = self._read_spilled()
+        pending = spilled + batch
+        for start in range(0, len(pending), self.batch_size):
+            if self._post(pending[start:start + self.batch_size]):
+                continue
+            if start >= len(spilled):
+                if spilled:
+                    os.remove(self.spill_path)
+                self._spill(pending[start:])
+            elif start:
+                self._rewrite_spilled(pending[start:])
+            else:
+                self._spill(batch)
+            return
+        if spilled:
+            os.remove(self.spill_path)
+
+    def _post(self, events):
+        # Logs once if every attempt fails, not once per attempt
+        delay = self.backoff
+        error = None
+        for attempt in range(self.retries + 1):
+            if attempt:
+                # Don't hold up shutdown waiting out a long backoff
+                if self._stopping.wait(delay):
+                    break
+                delay *= 2
+            try:
+                self.requests_made += 1
+                response = self.session.post(self.url, json={'events': events}, timeout=self.timeout)
+                response.raise_for_status()
+                self.sent += len(events)
+                return True
+            except requests.exceptions.RequestException as e:
+                error = e
+        logger.warning("could not send %d word-found events to %s after %d attempts: %s",
+                       len(events), self.url, attempt + 1, error)
+        return False
+
+    def _lines(self, events, room):
+        # JSON lines for as many of events as fit in room bytes; the rest are dropped
+        lines = []
+        for event in events:
+            line = json.dumps(event) + '\n'
+            room -= len(line.encode('utf-8'))
+            if room < 0:
+                self.dropped += len(events) - len(lines)
+                break
+            lines.append(line)
+        return lines
+
+    def _spill(self, events):
+        try:
+            size = os.path.getsize(self.spill_path)
+        except OSError:
+            size = 0
+        lines = self._lines(events, self.max_spill_bytes - size)
+        with open(self.spill_path, 'a', encoding='utf-8') as spill:
+            spill.writelines(lines)
+        self.spilled += len(lines)
+
+    def _rewrite_spilled(self, events):
+        tmp_path = self.spill_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as spill:
+            spill.writelines(self._lines(events, self.max_spill_bytes))
+        os.replace(tmp_path, self.spill_path)
+
+    def _read_spilled(self):
+        if not os.path.exists(self.spill_path):
+            return []
+        with open(self.spill_path, encoding='utf-8') as spill:
+            return [json.loads(line) for line in spill if line.strip()]
@@ -0,0 +1,152 @@
+import csv
+import json
+import os
+import string
+import unicodedata
+
+from puzzle import Trie
+
+FORMATS = ('csv', 'tsv', 'jsonl')
+EXTENSIONS = {'.csv': 'csv', '.tsv': 'tsv', '.txt': 'tsv', '.jsonl': 'jsonl', '.ndjson': 'jsonl'}
+
+MIN_LENGTH = 2
+
+# Rejected lines kept in an ImportReport to show; the rest are only counted
+REJECT_SAMPLES = 20
+
+_LETTERS = frozenset(string.ascii_letters)
+
+# What errors='replace' reads a byte that isn't UTF-8 as
+REPLACEMENT_CHARACTER = '\ufffd'
+
+# Letters NFKD leaves whole, spelled the way they are usually written in ASCII
+SPELLINGS = {'ß': 'SS', 'ẞ': 'SS', 'Æ': 'AE', 'æ': 'AE', 'Œ': 'OE', 'œ': 'OE', 'Ø': 'O', 'ø': 'O', 'Đ': 'D',
+             'đ': 'D', 'Ð': 'D', 'ð': 'D', 'Ł': 'L', 'ł': 'L', 'Þ': 'TH', 'þ': 'TH', 'ı': 'I'}
+
+
+def detect_format(path):
+    # From the file extension; anything unknown is read as the tab-separated
+    # format build_dictionary has always taken
+    return EXTENSIONS.get(os.path.splitext(path)[1].lower(), 'tsv')
+
+
+def normalise(word):
+    # Upper-case ASCII letters only: accents are folded away ("Café" is CAFE),
+    # letters in SPELLINGS are spelled out ("Straße" is STRASSE) and anything
+    # that is not a letter, like spaces and hyphens, is dropped. None when the
+    # word has a letter with no ASCII spelling, or a character that could not
+    # be decoded, rather than leaving it out.
+    letters = []
+    for char in unicodedata.normalize('NFKD', word):
+        if char in _LETTERS:
+            letters.append(char)
+        elif char in SPELLINGS:
+            letters.append(SPELLINGS[char])
+        elif char.isalpha() or char == REPLACEMENT_CHARACTER:
+            return None
+    return ''.join(letters).upper()
+
+
+class ImportReport:
+    # What an import did with each line: how many words it took, how many lines
+    # it turned away for each reason, and the first REJECT_SAMPLES of those as
+    # (line number, reason, text) so the problem can be found in the file.
+    def __init__(self):
+        self.accepted = 0
+        self.rejected = {}
+        self.samples = []
+
+    def accept(self):
+        self.accepted += 1
+
+    def reject(self, line_number, reason, text):
+        self.rejected[reason] = self.rejected.get(reason, 0) + 1
+        if len(self.samples) < REJECT_SAMPLES:
+            self.samples.append((line_number, reason, text[:80]))
+
+    def as_dict(self):
+        return {'accepted': self.accepted, 'rejected': dict(self.rejected),
+                'samples': [{'line': line, 'reason': reason, 'text': text} for line, reason, text in self.samples]}
+
+    def __str__(self):
+        lines = [f"{self.accepted} words imported, {sum(self.rejected.values())} lines rejected"]
+        lines += [f"  {reason}: {count}" for reason, count in sorted(self.rejected.items())]
+        lines += [f"  line {line} ({reason}): {text!r}" for line, reason, text in self.samples]
+        return '\n'.join(lines)
+
+
+def _rows(f, file_format):
+    # (line number, word, definition, text) for each non-blank line of f, with
+    # word None when the line can't be read as a word entry at all
+    if file_format == 'csv':
+        reader = csv.reader(f)
+        for row in reader:
+            text = ','.join(row)
+            if not text.strip():
+                continue
+            if reader.line_num == 1 and row[0].strip().lower() == 'word':
+                continue  # header
+            yield reader.line_num, row[0], row[1] if len(row) > 1 else '', text
+        return
+    for line_number, line in enumerate(f, 1):
+        text = line.rstrip('\r\n')
+        if not text.strip():
+            continue
+        if file_format == 'tsv':
+            word, _, definition = text.partition('\t')
+            yield line_number, word, definition, text
+            continue
+        try:
+            entry = json.loads(text)
+        except ValueError:
+            yield line_number, None, None, text
+            continue
+        if isinstance(entry, dict) and isinstance(entry.get('word'), str):
+            yield line_number, entry['word'], entry.get('definition') or '', text
+        elif isinstance(entry, list) and entry and isinstance(entry[0], str):
+            yield line_number, entry[0], entry[1] if len(entry) > 1 else '', text
+        else:
+            yield line_number, None, None, text
+
+
+def import_words(path, max_length=None, min_length=MIN_LENGTH, trie=None, report=None, file_format=None):
+    # Streams the (word, definition) entries of a CSV, TSV or JSONL file one line
+    # at a time, so a list of any size is read in memory bounded by the words
+    # kept. Words are normalised, those shorter than min_length or longer than
+    # max_length (the longest line on the board) are rejected, and each is
+    # inserted into trie (a puzzle.Trie or CompactTrie) as it is read; a word the trie already
+    # holds is a duplicate and the first definition stays. Yields the words
+    # kept in file order and tallies the rest in report; a line that is not valid
+    # UTF-8 is rejected as 'not UTF-8' rather than imported with letters missing.
+    file_format = file_format or detect_format(path)
+    if file_format not in FORMATS:
+        raise ValueError(f"unknown word list format {file_format!r}; use {', '.join(FORMATS)}")
+    trie = trie if trie is not None else Trie()
+    report = report if report is not None else ImportReport()
+    with open(path, encoding='utf-8', errors='replace', newline='' if file_format == 'csv' else None) as f:
+        for line_number, raw_word, definition, text in _rows(f, file_format):
+            if REPLACEMENT_CHARACTER in text:
+                report.reject(line_number, 'not UTF-8', text)
+                continue
+            if raw_word is None:
+                report.reject(line_number, 'malformed', text)
+                continue
+            word = normalise(raw_word)
+            if word is None:
+                report.reject(line_number, 'unsupported letters', text)
+            elif not word:
+                report.reject(line_number, 'no letters', text)
+            elif len(word) < min_length:
+                report.reject(line_number, 'too short', text)
+            elif max_length is not None and len(word) > max_length:
+                report.reject(line_number, 'too long', text)
+            elif not trie.insert(word, str(definition).strip() or None, replace=False):
+                report.reject(line_number, 'duplicate', text)
+            else:
+                report.accept()
+                yield word, str(definition).strip() or None
+
+
+def read_word_list(path, max_length=None, report=None, file_format=None):
+    # One theme as a [(word, definition), ...] list, as in puzzle.WORD_LISTS
+    return list(import_words(path, max_length, report=report, file_format=file_format))
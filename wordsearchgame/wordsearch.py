@@ -1,7 +1,12 @@
 import random
-import string
 import pygame
 import sys
+from functools import lru_cache
+from puzzle import Trie, WordSearchCSP
+from animation import Timeline, Tween
+from board_renderer import FRAME_RATE, BoardRenderer
+from grid_solver import word_index
+from render_cache import cell_rects, get_font, glyph_atlas, render_text
 
 BLACK = (0, 0, 0)
 WHITE = (200, 200, 200)
@@ -10,167 +15,8 @@ GREEN = (0, 255, 0)
 YELLOW = (255, 255, 0)  # Define a brighter color (Yellow)
 ORANGE = (255, 165, 0)  # Define a brighter color (Orange)
 
-class TrieNode:
-    def __init__(self):
-        self.children = {}
-        self.is_end_of_word = False
-
-class Trie:
-    def __init__(self):
-        self.root = TrieNode()
-
-    def insert(self, word):
-        node = self.root
-        for char in word:
-            if char not in node.children:
-                node.children[char] = TrieNode()
-            node = node.children[char]
-        node.is_end_of_word = True
-
-    def search(self, word):
-        current = self.root
-        for char in word:
-            if char not in current.children:
-                return False
-            current = current.children[char]
-        return current.is_end_of_word
-    
-    def get_all_words(self):
-        words = []
-        self._get_all_words_recursive(self.root, "", words)
-        return words
-
-    def _get_all_words_recursive(self, node, current_word, words):
-        if node.is_end_of_word:
-            words.append(current_word)
-
-        for char, child_node in node.children.items():
-            self._get_all_words_recursive(child_node, current_word + char, words)
-
-class WordSearchGraph:
-    def __init__(self, grid):
-        self.grid = grid
-        self.rows = len(grid)
-        self.cols = len(grid[0])
-        self.graph = {}
-
-    def add_edge(self, node1, node2):
-        if node1 in self.graph:
-            self.graph[node1].append(node2)
-        else:
-            self.graph[node1] = [node2]
-
-    def build_graph(self):
-        for i in range(self.rows):
-            for j in range(self.cols):
-                current_node = (i, j)
-
-                # Connect with horizontal and vertical neighbors
-                for ni, nj in [(i + 1, j), (i - 1, j), (i, j + 1), (i, j - 1)]:
-                    if 0 <= ni < self.rows and 0 <= nj < self.cols:
-                        neighbor_node = (ni, nj)
-                        self.add_edge(current_node, neighbor_node)
-
-                # Connect with diagonal neighbors
-                for ni, nj in [(i + 1, j + 1), (i - 1, j - 1), (i - 1, j + 1), (i + 1, j - 1)]:
-                    if 0 <= ni < self.rows and 0 <= nj < self.cols:
-                        neighbor_node = (ni, nj)
-                        self.add_edge(current_node, neighbor_node)
-
-    def fill_empty_spaces(self):
-        for i in range(self.rows):
-            for j in range(self.cols):
-                if self.grid[i][j] == ' ':
-                    self.grid[i][j] = random.choice(string.ascii_uppercase)
-
-    def word_search_csp(self, words, index=0):
-        if index == len(words):
-            return True  # All words placed successfully
-
-        word = words[index]
-        nodes = [(i, j) for i in range(self.rows) for j in range(self.cols)]
-        random.shuffle(nodes)  # Randomize node selection
-        for node in nodes:
-            for direction in ['horizontal', 'vertical', 'diagonal']:
-                for orientation in [1, -1]:
-                    if self.is_valid_assignment(word, node, direction, orientation):
-                        self.assign_word(word, node, direction, orientation)
-                        if self.word_search_csp(words, index + 1):
-                            return True
-                        self.unassign_word(word, node, direction, orientation)
-
-        return False
-
-    def is_valid_assignment(self, word, node, direction, orientation):
-        if direction == 'horizontal':
-            return all(0 <= node[1] + i * orientation < self.cols and
-                       (self.grid[node[0]][node[1] + i * orientation] == ' ' or
-                        self.grid[node[0]][node[1] + i * orientation] == word[i]) for i in range(len(word)))
-        elif direction == 'vertical':
-            return all(0 <= node[0] + i * orientation < self.rows and
-                       (self.grid[node[0] + i * orientation][node[1]] == ' ' or
-                        self.grid[node[0] + i * orientation][node[1]] == word[i]) for i in range(len(word)))
-        elif direction == 'diagonal':
-            return all(0 <= node[0] + i * orientation < self.rows and
-                       0 <= node[1] + i * orientation < self.cols and
-                       (self.grid[node[0] + i * orientation][node[1] + i * orientation] == ' ' or
-                        self.grid[node[0] + i * orientation][node[1] + i * orientation] == word[i]) for i in range(len(word)))
-        return False
-    def assign_word(self, word, node, direction, orientation):
-        if direction == 'horizontal':
-            a = random.choice([0, 1])
-            for i in range(len(word)):
-                if a == 0:
-                    self.grid[node[0]][node[1] + i * orientation] = word[-i - 1]
-                if a == 1:
-                    self.grid[node[0]][node[1] + i * orientation] = word[i]
-        elif direction == 'vertical':
-            a = random.choice([0, 1])
-            for i in range(len(word)):
-                if a == 0:
-                    self.grid[node[0] + i * orientation][node[1]] = word[-i - 1]
-                if a == 1:
-                    self.grid[node[0] + i * orientation][node[1]] = word[i]
-        elif direction == 'diagonal':
-            a = random.choice([0, 1])
-            for i in range(len(word)):
-                if a == 0:
-                    self.grid[node[0] + i * orientation][node[1] + i * orientation] = word[-i - 1]
-                if a == 1:
-                    self.grid[node[0] + i * orientation][node[1] + i * orientation] = word[i]
-
-    def unassign_word(self, word, node, direction, orientation):
-        if direction == 'horizontal' or direction == 'vertical':
-            for i in range(len(word)):
-                row = node[0]
-                col = node[1] + i * orientation
-                if 0 <= row < self.rows and 0 <= col < self.cols:
-                    self.grid[row][col] = ' '
-        elif direction == 'diagonal':
-            for i in range(len(word)):
-                row = node[0] + i * orientation
-                col = node[1] + i * orientation
-                if 0 <= row < self.rows and 0 <= col < self.cols:
-                    self.grid[row][col] = ' '
-
-class WordSearchCSP:
-    def __init__(self, grid_size, trie):
-        self.grid_size = grid_size
-        self.word_search_graph = WordSearchGraph([[' ' for _ in range(grid_size)] for _ in range(grid_size)])  # Adjusted grid size here
-        self.trie = trie
-        self.words = trie.get_all_words()
-
-
-    def solve(self):
-        return self.word_search_graph.word_search_csp(self.words)
-
-    def display_grid(self):
-        for row in self.word_search_graph.grid:
-            print(' '.join(row))
-
-
-
-def main():
+
+def main(fps=FRAME_RATE):
     global SCREEN, CLOCK
     pygame.init()
     SCREEN = pygame.display.set_mode((890, 670))  # Increased width and height to accommodate score, time, and border
@@ -234,9 +80,35 @@ def main():
     last_clicked_cell = None
     clicked_word = ""
 
+    grid = word_search_csp_example.word_search_graph.grid
+    answer_key = word_index(grid, trie_example)
+    blinking_cells = {}
+    renderer = BoardRenderer(SCREEN, grid_size, grid_size, 600 // grid_size,
+                             lambda i, j, rect: draw_cell(grid, i, j, rect, found_words, blinking_cells), BLACK)
+    # Blinks and the end screen are timed by the timeline, never by delays
+    timeline = Timeline()
+    game_over = False
+
     while True:
-        draw_game_ui(word_search_csp_example.word_search_graph.grid, score, start_time, found_words,chosen_word_list)
-        pygame.display.update()
+        timeline.update()
+        if game_over:
+            # The end screen stays up until its timer closes the game, but quitting
+            # still works straight away
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    close_game()
+            CLOCK.tick(fps)
+            continue
+
+        # Only changed cells and HUD values are redrawn and pushed to the display
+        seconds = (pygame.time.get_ticks() - start_time) // 1000
+        renderer.draw_cells()
+        renderer.region('words', len(found_words),
+                        lambda: display_chosen_words_in_score_area(chosen_word_list, found_words))
+        renderer.region('score', score, lambda: display_score(score))
+        renderer.region('time', seconds, lambda: display_time(start_time))
+        renderer.present()
+        CLOCK.tick(fps)
 
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
@@ -258,15 +130,17 @@ def main():
                     if clicked_word not in found_words:
                         print("Word found:", clicked_word)
                         found_words.add(clicked_word)
-                        highlight_word(clicked_word, word_search_csp_example.word_search_graph.grid)
+                        renderer.invalidate(highlight_word(clicked_word, grid, answer_key))
                         score += 10  # Increase score by 10
                         clicked_word = ""
                         last_clicked_cell = None
 
-                blink_cell(clicked_row, clicked_col, grid_size)
+                blink_cell(clicked_row, clicked_col, grid_size, timeline, renderer, blinking_cells)
 
         if len(found_words) == len(chosen_word_list):
             display_gameover_win(score, start_time)
+            game_over = True
+            timeline.after(10000, close_game)  # Wait for 10 seconds before closing the window
 
     
 
@@ -308,7 +182,9 @@ def display_gameover_win(score, start_time):
     display_time(start_time)
 
     pygame.display.update()
-    pygame.time.delay(10000)  # Wait for 3 seconds before closing the window
+
+
+def close_game():
     pygame.quit()
     sys.exit()
 
@@ -334,9 +210,9 @@ def display_gameover_win(score, start_time):
 
 
 def display_chosen_words_in_score_area(chosen_word_list, found_words):
-    font = pygame.font.Font(None, 24)
     text_x = 620  # Start x position for displaying words
     text_y = 50   # Start y position for displaying words
+    area = pygame.Rect(text_x, text_y, 0, 0)
     max_width = 200  # Maximum width for text in the score area
 
     # Filter out the words that have already been found
@@ -352,16 +228,18 @@ def display_chosen_words_in_score_area(chosen_word_list, found_words):
         # Display the wrapped text
         for line in wrapped_text:
             text_rect = line.get_rect(topleft=(text_x, text_y))
-            SCREEN.blit(line, text_rect)
+            area.union_ip(SCREEN.blit(line, text_rect))
             text_y += 20  # Increase y position for the next line
+    return area
 
 
 
+@lru_cache(maxsize=256)
 def wrap_text(text_surface, max_width):
     words = text_surface.split(' ')
     wrapped_lines = []
     current_line = ''
-    font = pygame.font.Font(None, 24)
+    font = get_font(24)
 
     for word in words:
         test_line = current_line + word + ' '
@@ -369,49 +247,37 @@ def wrap_text(text_surface, max_width):
         if test_width <= max_width:
             current_line = test_line
         else:
-            wrapped_lines.append(font.render(current_line, True, WHITE))
+            wrapped_lines.append(render_text(current_line, 24, WHITE))
             current_line = word + ' '
 
-    wrapped_lines.append(font.render(current_line, True, WHITE))
+    wrapped_lines.append(render_text(current_line, 24, WHITE))
     return wrapped_lines
 
 
 def display_score(score):
-    font = pygame.font.Font(None, 36)
-    text = font.render(f"Score: {score}", True, WHITE)
+    text = render_text(f"Score: {score}", 36, WHITE)
     text_rect = text.get_rect(bottomleft=(620, 600))
-    SCREEN.blit(text, text_rect)
+    return SCREEN.blit(text, text_rect)
 
 def display_time(start_time):
     elapsed_time = pygame.time.get_ticks() - start_time
     seconds = elapsed_time // 1000
-    font = pygame.font.Font(None, 36)
-    text = font.render(f"Time: {seconds} sec", True, WHITE)
+    text = render_text(f"Time: {seconds} sec", 36, WHITE)
     text_rect = text.get_rect(bottomleft=(620, 640))
-    SCREEN.blit(text, text_rect)
-
+    return SCREEN.blit(text, text_rect)
 
-def highlight_word(word, grid):
-    rows = len(grid)
-    cols = len(grid[0])
-    directions = [(1, 0), (0, 1), (1, 1), (1, -1), (-1, 0), (0, -1), (-1, -1), (-1, 1)]
 
-    for i in range(rows):
-        for j in range(cols):
-            for dx, dy in directions:
-                found_word = ""
-                for length in range(len(word)):
-                    end_x = i + length * dx
-                    end_y = j + length * dy
-                    if 0 <= end_x < rows and 0 <= end_y < cols:
-                        found_word += grid[end_x][end_y]
-                        if found_word == word:
-                            for k in range(len(word)):
-                                grid[end_x - k * dx][end_y - k * dy] = grid[end_x - k * dx][end_y - k * dy].lower()
-                            return
-                    else:
-                        break
-    return
+def highlight_word(word, grid, index=None):
+    # index is the word -> cells answer key from grid_solver.word_index(); without
+    # it the board is scanned for just this word
+    if index is None:
+        trie = Trie()
+        trie.insert(word)
+        index = word_index(grid, trie)
+    cells = index.get(word, [])
+    for x, y in cells:
+        grid[x][y] = grid[x][y].lower()
+    return cells
 
 
 
@@ -429,7 +295,8 @@ def find_selected_word(trie, grid, start, chosen_word_list):
                 x, y = start
                 while 0 <= x < rows and 0 <= y < cols:
                     word += grid[x][y]
-                    if trie.search(word):
+                    found, _ = trie.search(word)
+                    if found:
                         for w, definition in chosen_word_list:
                             if w == word:
                                 return word, definition
@@ -441,26 +308,30 @@ def display_found_words(grid, found_words):
     rows = len(grid)
     cols = len(grid[0])
     blockSize = 600 // cols
+    atlas = glyph_atlas(36, (WHITE, GREEN))
+    rects = cell_rects(rows, cols, blockSize)
 
     for i in range(rows):
         for j in range(cols):
-            cell_center = (j * blockSize + blockSize // 2, i * blockSize + blockSize // 2)
             cell_word = grid[i][j]
             if cell_word.lower() in found_words:
-                text = pygame.font.Font(None, 36).render(cell_word, True, GREEN)
-                text_rect = text.get_rect(center=cell_center)
-                SCREEN.blit(text, text_rect)
-
-def blink_cell(row, col, grid_size):
-    blockSize = 600 // grid_size
-    x = col * blockSize
-    y = row * blockSize
-    rect = pygame.Rect(x, y, blockSize, blockSize)
-    pygame.draw.rect(SCREEN, RED, rect, 1)
-    pygame.display.update()
-    pygame.time.delay(100)
-    pygame.draw.rect(SCREEN, BLACK, rect, 1)
-    pygame.display.update()
+                atlas.blit(SCREEN, cell_word, GREEN, rects[i][j].center)
+
+def blink_cell(row, col, grid_size, timeline, renderer, blinking_cells):
+    # Outlines the cell in red for 100 ms; draw_cell paints the outline while the
+    # cell is in blinking_cells, so input keeps flowing during the blink
+    cell = (row, col)
+    if not (0 <= row < grid_size and 0 <= col < grid_size):
+        return
+    if cell in blinking_cells:
+        timeline.cancel(blinking_cells[cell])
+
+    def finish():
+        del blinking_cells[cell]
+        renderer.invalidate([cell])
+
+    blinking_cells[cell] = timeline.add(Tween(100, on_finish=finish))
+    renderer.invalidate([cell])
 
 # def blink_cell(row, col, grid_size):
 #     blockSize = 600 // grid_size
@@ -492,15 +363,13 @@ def draw_grid(grid):
     cols = len(grid[0])
 
     blockSize = 600 // cols
+    atlas = glyph_atlas(36, (WHITE, GREEN))
+    rects = cell_rects(rows, cols, blockSize)
     for i in range(rows):
         for j in range(cols):
-            x = j * blockSize
-            y = i * blockSize
-            rect = pygame.Rect(x, y, blockSize, blockSize)
+            rect = rects[i][j]
             pygame.draw.rect(SCREEN, RED, rect, 1)
-            text = pygame.font.Font(None, 36).render(grid[i][j], True, WHITE)
-            text_rect = text.get_rect(center=rect.center)
-            SCREEN.blit(text, text_rect)
+            atlas.blit(SCREEN, grid[i][j], WHITE, rect.center)
 
             if grid[i][j].islower():
                 pygame.draw.rect(SCREEN, RED, rect)
@@ -508,6 +377,25 @@ def draw_grid(grid):
                 pygame.draw.rect(SCREEN, WHITE, rect, 1)
 
 
+def draw_cell(grid, i, j, rect, found_words, blinking_cells=()):
+    # One cell as draw_grid, the border and display_found_words would leave it
+    rows = len(grid)
+    cols = len(grid[0])
+    atlas = glyph_atlas(36, (WHITE, GREEN))
+    pygame.draw.rect(SCREEN, RED, rect, 1)
+    atlas.blit(SCREEN, grid[i][j], WHITE, rect.center)
+    if grid[i][j].islower():
+        pygame.draw.rect(SCREEN, RED, rect)
+    else:
+        pygame.draw.rect(SCREEN, WHITE, rect, 1)
+    if i in (0, rows - 1) or j in (0, cols - 1):
+        pygame.draw.rect(SCREEN, WHITE, (0, 0, 600, 600), 2)
+    if grid[i][j].lower() in found_words:
+        atlas.blit(SCREEN, grid[i][j], GREEN, rect.center)
+    if (i, j) in blinking_cells:
+        pygame.draw.rect(SCREEN, RED, rect, 1)
+
+
 
 
 if __name__ == "__main__":